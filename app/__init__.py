@@ -1,5 +1,7 @@
 # app/__init__.py
+import os
 from flask import Flask
+from jinja2 import FileSystemBytecodeCache
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_login import LoginManager
@@ -10,27 +12,101 @@ migrate = Migrate()
 login_manager = LoginManager()
 login_manager.login_view = 'main.login' 
 
-def create_app():
+def create_app(config_class=Config):
     app = Flask(__name__)
-    app.config.from_object(Config) 
+    app.config.from_object(config_class) 
 
     db.init_app(app) 
     migrate.init_app(app, db) 
     login_manager.init_app(app) 
 
+    # Папка для загрузок создается один раз при создании приложения
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+
     # Регистрация кастомных фильтров
     from app.custom_filters import nl2br
     app.jinja_env.filters['nl2br'] = nl2br
 
+    # Статические файлы с хешами в именах и предварительным сжатием
+    from app.assets import init_assets
+    init_assets(app)
+
+    # Сжатие HTML и JSON ответов
+    from app.compression import init_compression
+    init_compression(app)
+
+    # Замер потокового рендеринга и сжатия (flask pages benchmark)
+    from app.rendering import init_rendering
+    init_rendering(app)
+
+    # Метрики Prometheus (/metrics)
+    from app.metrics import init_metrics
+    init_metrics(app)
+
     # Импорт и регистрация Blueprint
     from app import routes, models
     app.register_blueprint(routes.bp)
+
+    # Рейтинг популярных постов (flask trending refresh)
+    from app.trending import init_trending
+    init_trending(app)
+
+    # Индекс похожих постов (flask related rebuild)
+    from app.related import init_related
+    init_related(app)
+
+    # Проверка планов горячих запросов (flask indexes check)
+    from app.query_plans import init_query_plans
+    init_query_plans(app)
+
+    # Возобновляемые загрузки (flask uploads cleanup)
+    from app.uploads import init_uploads
+    init_uploads(app)
+
+    # Секционирование комментариев и лайков (flask partitions ...)
+    from app.partitioning import init_partitioning
+    init_partitioning(app)
+
+    # Экспорт данных пользователя (flask exports cleanup)
+    from app.exports import init_exports
+    init_exports(app)
+
+    # Карта сайта (flask sitemap build)
+    from app.sitemaps import init_sitemaps
+    init_sitemaps(app)
+
+    # Уведомления подписчиков (flask notifications send-digests)
+    from app.notifications import init_notifications
+    init_notifications(app)
+
+    # Счетчики просмотров постов (flask views flush|benchmark)
+    from app.post_views import init_post_views
+    init_post_views(app)
+
+    # Хеширование паролей (flask passwords benchmark)
+    from app.passwords import init_passwords
+    init_passwords(app)
     
     # Регистрация обработчиков ошибок
     register_error_handlers(app)
 
+    # Кеш байткода и предварительная компиляция шаблонов
+    configure_templates(app)
+
     return app
 
+def configure_templates(app):
+    """Подключает общий для воркеров кеш байткода Jinja и компилирует шаблоны заранее"""
+    cache_dir = app.config['JINJA_CACHE_DIR']
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+
+    if app.config['PRECOMPILE_TEMPLATES']:
+        # Шаблоны попадают в кеш окружения Jinja; при preload_app воркеры получают их после fork
+        for name in app.jinja_env.list_templates(extensions=['html']):
+            app.jinja_env.get_template(name)
+
 def register_error_handlers(app):
     """Регистрация централизованных обработчиков ошибок"""
     from flask import render_template
@@ -0,0 +1,143 @@
+# app/assets.py
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+
+import click
+from flask import current_app, request, send_from_directory
+from flask.cli import AppGroup
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен: без него собираются только .gz
+    brotli = None
+
+MANIFEST_NAME = 'manifest.json'
+
+# Эти файлы имеет смысл сжимать заранее; изображения и видео уже сжаты
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.svg', '.json', '.txt', '.html', '.xml'}
+
+# Каталоги внутри static, которые не являются ассетами сборки
+EXCLUDED_DIRS = {'uploads'}
+
+assets_cli = AppGroup('assets', help='Сборка статических файлов.')
+
+
+def _file_hash(path, length=12):
+    """Возвращает короткий sha256-хеш содержимого файла"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:length]
+
+
+def load_manifest(static_folder):
+    """Читает манифест {исходное имя: имя с хешем}; пустой словарь, если сборки не было"""
+    manifest_path = os.path.join(static_folder, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _write_compressed(path, data):
+    """Пишет рядом с файлом .gz и (если доступен brotli) .br варианты"""
+    with open(path + '.gz', 'wb') as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(path + '.br', 'wb') as f:
+            f.write(brotli.compress(data, quality=11))
+
+
+def build_assets(static_folder):
+    """Создает копии статических файлов с хешем в имени, их сжатые варианты и манифест.
+
+    Устаревшие файлы предыдущей сборки удаляются.
+    """
+    old_manifest = load_manifest(static_folder)
+    old_outputs = set(old_manifest.values())
+    manifest = {}
+
+    for root, dirs, files in os.walk(static_folder):
+        dirs[:] = [d for d in dirs if os.path.relpath(os.path.join(root, d), static_folder) not in EXCLUDED_DIRS]
+        for name in files:
+            path = os.path.join(root, name)
+            rel_path = os.path.relpath(path, static_folder).replace(os.sep, '/')
+            if rel_path == MANIFEST_NAME or name.endswith(('.gz', '.br')) or rel_path in old_outputs:
+                continue
+
+            base, ext = os.path.splitext(rel_path)
+            hashed_path = f"{base}.{_file_hash(path)}{ext}"
+            target = os.path.join(static_folder, hashed_path)
+            with open(path, 'rb') as f:
+                data = f.read()
+            if not os.path.exists(target):
+                with open(target, 'wb') as f:
+                    f.write(data)
+            if ext.lower() in COMPRESSIBLE_EXTENSIONS:
+                _write_compressed(target, data)
+            manifest[rel_path] = hashed_path
+
+    for stale in old_outputs - set(manifest.values()):
+        for suffix in ('', '.gz', '.br'):
+            stale_path = os.path.join(static_folder, stale + suffix)
+            if os.path.exists(stale_path):
+                os.remove(stale_path)
+
+    with open(os.path.join(static_folder, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    return manifest
+
+
+def send_static_asset(filename):
+    """Отдает статический файл; для файлов с хешем выбирает сжатый вариант и кеширует навсегда"""
+    static_folder = current_app.static_folder
+    fingerprinted = current_app.extensions['assets']['fingerprinted']
+    if filename not in fingerprinted:
+        return current_app.send_static_file(filename)
+
+    max_age = current_app.config['STATIC_MAX_AGE']
+    mimetype = mimetypes.guess_type(filename)[0]
+    encoding = None
+    for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if request.accept_encodings[candidate] and os.path.isfile(os.path.join(static_folder, filename + suffix)):
+            encoding = candidate
+            filename += suffix
+            break
+
+    response = send_from_directory(static_folder, filename, mimetype=mimetype, max_age=max_age)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def init_assets(app):
+    """Подключает манифест к url_for('static') и заменяет обработчик статики"""
+    manifest = load_manifest(app.static_folder)
+    app.extensions['assets'] = {
+        'manifest': manifest,
+        'fingerprinted': set(manifest.values()),
+    }
+
+    @app.url_defaults
+    def fingerprint_static_url(endpoint, values):
+        if endpoint == 'static' and 'filename' in values:
+            values['filename'] = manifest.get(values['filename'], values['filename'])
+
+    app.view_functions['static'] = send_static_asset
+    app.cli.add_command(assets_cli)
+
+
+@assets_cli.command('build')
+def build_command():
+    """Собирает статические файлы с хешами и сжатыми вариантами"""
+    manifest = build_assets(current_app.static_folder)
+    if brotli is None:
+        click.echo('Модуль brotli не установлен, создаются только .gz файлы.')
+    click.echo(f'Собрано файлов: {len(manifest)}')
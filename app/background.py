@@ -0,0 +1,54 @@
+# app/background.py
+"""Фоновые задачи в потоках воркера (без отдельной очереди задач).
+
+Задача выполняется в контексте приложения со своей сессией БД. У каждого вида
+задач свой пул (BACKGROUND_POOLS: имя -> ключ конфигурации с числом потоков),
+поэтому долгие задачи одного вида не задерживают остальные. Пулы создаются
+заново в каждом воркере после fork (gunicorn preload_app).
+
+Задачи живут только в памяти воркера: при его перезапуске (max_requests,
+деплой, падение) незаконченные задачи пропадают. Вызывающий код должен уметь
+это обнаружить и повторить работу.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from app import db
+
+BACKGROUND_POOLS = {
+    'background': 'BACKGROUND_THREADS',
+    'exports': 'EXPORT_THREADS',
+}
+
+_executors = {}
+_executors_pid = None
+_executors_lock = threading.Lock()
+
+
+def _get_executor(app, pool):
+    global _executors_pid
+    with _executors_lock:
+        if _executors_pid != os.getpid():
+            _executors.clear()
+            _executors_pid = os.getpid()
+        if pool not in _executors:
+            _executors[pool] = ThreadPoolExecutor(max_workers=app.config[BACKGROUND_POOLS[pool]], thread_name_prefix=pool)
+        return _executors[pool]
+
+
+def _run(app, func, args):
+    with app.app_context():
+        try:
+            return func(*args)
+        except Exception:
+            db.session.rollback()
+            app.logger.exception('Ошибка фоновой задачи %s%r', func.__name__, args)
+
+
+def submit(func, *args, pool='background'):
+    """Запускает func(*args) в фоновом потоке пула pool; вызывать внутри запроса или контекста приложения"""
+    app = current_app._get_current_object()
+    return _get_executor(app, pool).submit(_run, app, func, args)
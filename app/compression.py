@@ -0,0 +1,121 @@
+# app/compression.py
+import zlib
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # без brotli используется только gzip
+    brotli = None
+
+
+class _GzipStream:
+    """Инкрементальный gzip-компрессор"""
+
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class _BrotliStream:
+    """Инкрементальный brotli-компрессор"""
+
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+def _choose_encoding():
+    """Выбирает лучшую кодировку, которую принимает клиент"""
+    if brotli is not None and request.accept_encodings['br']:
+        return 'br'
+    if request.accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+
+def _make_compressor(encoding):
+    config = current_app.config
+    if encoding == 'br':
+        return _BrotliStream(config['COMPRESS_BR_QUALITY'])
+    return _GzipStream(config['COMPRESS_LEVEL'])
+
+
+def _compress_stream(chunks, compressor, flush_size):
+    """Сжимает потоковый ответ по частям.
+
+    Накопив flush_size байт исходных данных, делает sync flush, чтобы клиент
+    получил начало страницы, не дожидаясь конца рендеринга.
+    """
+    pending = 0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            if not chunk:
+                continue
+            data = compressor.compress(chunk)
+            pending += len(chunk)
+            if pending >= flush_size:
+                data += compressor.flush()
+                pending = 0
+            if data:
+                yield data
+        yield compressor.finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+def compress_response(response):
+    """Сжимает HTML и JSON ответы gzip или brotli"""
+    config = current_app.config
+    if (
+        not config['COMPRESS_ENABLED']
+        or request.method == 'HEAD'
+        or response.status_code < 200
+        or response.status_code in (204, 304)
+        or response.direct_passthrough
+        or 'Content-Encoding' in response.headers
+        or response.mimetype not in config['COMPRESS_MIMETYPES']
+    ):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = _choose_encoding()
+    if encoding is None:
+        return response
+
+    compressor = _make_compressor(encoding)
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, compressor, config['STREAM_CHUNK_SIZE'])
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < config['COMPRESS_MIN_SIZE']:
+            return response
+        response.set_data(compressor.compress(data) + compressor.finish())
+
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_compression(app):
+    """Подключает сжатие ответов"""
+    app.after_request(compress_response)
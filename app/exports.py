@@ -0,0 +1,405 @@
+# app/exports.py
+"""Экспорт данных пользователя в zip-архив.
+
+Архив собирается на лету и отдается клиенту по частям: zipfile пишет в
+неперематываемый поток (_ZipStream), а генератор забирает из него накопленные
+байты после каждой записи. Блоги, посты и комментарии читаются серверными
+курсорами (yield_per), вложения копируются из UPLOAD_FOLDER блоками, поэтому
+память воркера не зависит от размера архива: в ней остаются только записи
+центрального каталога zip (по одной на файл).
+
+Потоковая отдача занимает синхронный воркер gunicorn на всю загрузку, а
+воркер, который дольше timeout не отвечает арбитру, убивается. Поэтому потоком
+отдаются только небольшие аккаунты (fits_streaming: EXPORT_STREAM_MAX_POSTS,
+EXPORT_STREAM_MAX_BYTES); для остальных тот же архив собирается в фоне
+(start_export) в EXPORT_FOLDER и скачивается позже; `flask exports cleanup` удаляет старые архивы.
+Фоновые сборки идут в отдельном пуле (EXPORT_THREADS) и не задерживают
+рассылку уведомлений. Сборка живет в памяти воркера: перезапуск воркера
+(max_requests, деплой) прерывает ее. Пока сборка идет, ее файл <token>.zip.part
+заблокирован через flock; незаблокированный .part значит, что воркер умер,
+и сборка помечается неудавшейся (<token>.failed) — пользователь запускает новую.
+"""
+import io
+import json
+import os
+import re
+import time
+import uuid
+import zipfile
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: прерванная сборка определяется по времени изменения файла
+    fcntl = None
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import func, select
+
+from app import background, db
+from app.models import Attachment, Blog, Comment, Post, Tag, User, post_tags
+
+exports_cli = AppGroup('exports', help='Экспорт данных пользователей.')
+
+FILE_BLOCK_SIZE = 64 * 1024
+TOKEN_RE = re.compile(r'^[0-9a-f]{32}$')
+# Без flock незаконченный архив, который давно не рос, считается брошенным
+STALE_PART_SECONDS = 15 * 60
+
+
+class _ZipStream(io.RawIOBase):
+    """Неперематываемый поток: zipfile пишет в него, генератор забирает записанные байты"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _safe_name(value, fallback):
+    """Имя для пути внутри архива: буквы, цифры, дефисы и точки"""
+    name = re.sub(r'[^\w.-]+', '-', value or '').strip('-.')[:60]
+    return name or fallback
+
+
+def _zip_time(value):
+    return value.timetuple()[:6] if value and value.year >= 1980 else (1980, 1, 1, 0, 0, 0)
+
+
+def _json(data):
+    return json.dumps(data, ensure_ascii=False, indent=2, default=str).encode('utf-8')
+
+
+def _stream(statement):
+    """Строки запроса через серверный курсор, по EXPORT_YIELD_PER за раз"""
+    yield_per = current_app.config['EXPORT_YIELD_PER']
+    return db.session.execute(statement.execution_options(yield_per=yield_per))
+
+
+def _write_json_array(archive, name, rows):
+    """Пишет JSON-массив по одному элементу; генератор отдает управление после каждой пачки"""
+    yield_every = current_app.config['EXPORT_YIELD_PER']
+    with archive.open(name, 'w') as f:
+        f.write(b'[')
+        for index, item in enumerate(rows):
+            f.write((b',\n' if index else b'\n') + _json(item))
+            if index % yield_every == yield_every - 1:
+                yield
+        f.write(b'\n]\n')
+    yield
+
+
+def _write_file(archive, name, path, modified):
+    """Копирует файл в архив блоками по FILE_BLOCK_SIZE без сжатия (медиафайлы уже сжаты)"""
+    info = zipfile.ZipInfo(name, date_time=_zip_time(modified))
+    info.compress_type = zipfile.ZIP_STORED
+    info.file_size = os.path.getsize(path)
+    with open(path, 'rb') as source, archive.open(info, 'w') as target:
+        while True:
+            block = source.read(FILE_BLOCK_SIZE)
+            if not block:
+                break
+            target.write(block)
+            yield
+
+
+def _post_markdown(post, blog_title, tags):
+    lines = [
+        f'# {post.title}',
+        '',
+        f'*Блог «{blog_title}», {post.created_at:%d.%m.%Y %H:%M}*',
+    ]
+    if tags:
+        lines.append(f'*Теги: {", ".join(tags)}*')
+    lines += ['', post.content, '']
+    return '\n'.join(lines).encode('utf-8')
+
+
+def _write_post(archive, folder, post, blog_title):
+    tags = list(db.session.scalars(
+        select(Tag.name).join(post_tags, post_tags.c.tag_id == Tag.id)
+        .where(post_tags.c.post_id == post.id).order_by(Tag.name)
+    ))
+    attachments = db.session.execute(
+        select(Attachment.id, Attachment.filename, Attachment.original_filename,
+               Attachment.mimetype, Attachment.file_type, Attachment.created_at)
+        .where(Attachment.post_id == post.id).order_by(Attachment.id)
+    ).all()
+    files = [
+        (attachment, f'attachments/{attachment.id}-{_safe_name(attachment.original_filename, attachment.filename)}')
+        for attachment in attachments
+    ]
+
+    archive.writestr(zipfile.ZipInfo(f'{folder}/post.md', _zip_time(post.created_at)),
+                     _post_markdown(post, blog_title, tags), zipfile.ZIP_DEFLATED)
+    archive.writestr(zipfile.ZipInfo(f'{folder}/post.json', _zip_time(post.created_at)), _json({
+        'id': post.id,
+        'title': post.title,
+        'content': post.content,
+        'created_at': post.created_at,
+        'tags': tags,
+        'attachments': [{
+            'file': path,
+            'original_filename': attachment.original_filename,
+            'mimetype': attachment.mimetype,
+            'file_type': attachment.file_type,
+            'created_at': attachment.created_at,
+        } for attachment, path in files],
+    }), zipfile.ZIP_DEFLATED)
+    yield
+
+    comments = _stream(
+        select(Comment.id, Comment.content, Comment.created_at, User.username)
+        .join(User, User.id == Comment.user_id)
+        .where(Comment.post_id == post.id).order_by(Comment.created_at)
+    )
+    yield from _write_json_array(archive, f'{folder}/comments.json', (
+        {'id': row.id, 'author': row.username, 'content': row.content, 'created_at': row.created_at}
+        for row in comments
+    ))
+
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    for attachment, path in files:
+        source = os.path.join(upload_folder, attachment.filename)
+        if os.path.isfile(source):
+            yield from _write_file(archive, f'{folder}/{path}', source, attachment.created_at)
+
+
+def _write_archive(archive, user_id):
+    """Пишет все данные пользователя в archive; отдает управление после каждой порции"""
+    user = db.session.get(User, user_id)
+    archive.writestr('profile.json', _json({
+        'id': user.id,
+        'username': user.username,
+        'email': user.email,
+        'role': user.role,
+    }), zipfile.ZIP_DEFLATED)
+    yield
+
+    blogs = db.session.execute(
+        select(Blog.id, Blog.title, Blog.description, Blog.created_at)
+        .where(Blog.owner_id == user_id).order_by(Blog.id)
+    ).all()
+    for blog in blogs:
+        blog_folder = f'blogs/{blog.id}-{_safe_name(blog.title, "blog")}'
+        archive.writestr(zipfile.ZipInfo(f'{blog_folder}/blog.json', _zip_time(blog.created_at)), _json({
+            'id': blog.id,
+            'title': blog.title,
+            'description': blog.description,
+            'created_at': blog.created_at,
+        }), zipfile.ZIP_DEFLATED)
+        archive.writestr(zipfile.ZipInfo(f'{blog_folder}/blog.md', _zip_time(blog.created_at)),
+                         f'# {blog.title}\n\n{blog.description}\n'.encode('utf-8'), zipfile.ZIP_DEFLATED)
+        yield
+
+        posts = _stream(
+            select(Post.id, Post.title, Post.content, Post.created_at)
+            .where(Post.blog_id == blog.id).order_by(Post.created_at)
+        )
+        for post in posts:
+            post_folder = f'{blog_folder}/posts/{post.id}-{_safe_name(post.title, "post")}'
+            yield from _write_post(archive, post_folder, post, blog.title)
+
+    # Комментарии пользователя ко всем постам, включая чужие блоги
+    comments = _stream(
+        select(Comment.id, Comment.post_id, Post.title, Comment.content, Comment.created_at)
+        .join(Post, Post.id == Comment.post_id)
+        .where(Comment.user_id == user_id).order_by(Comment.created_at)
+    )
+    yield from _write_json_array(archive, 'comments.json', (
+        {'id': row.id, 'post_id': row.post_id, 'post_title': row.title,
+         'content': row.content, 'created_at': row.created_at}
+        for row in comments
+    ))
+
+
+def iter_export(user_id):
+    """Генератор байтов zip-архива с данными пользователя"""
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for _ in _write_archive(archive, user_id):
+            data = stream.take()
+            if data:
+                yield data
+    yield stream.take()
+
+
+def fits_streaming(user_id):
+    """Архив достаточно мал, чтобы отдать его потоком за время жизни запроса воркера"""
+    config = current_app.config
+    posts = db.session.scalar(
+        select(func.count(Post.id)).join(Blog, Blog.id == Post.blog_id).where(Blog.owner_id == user_id)
+    )
+    if posts > config['EXPORT_STREAM_MAX_POSTS']:
+        return False
+    filenames = db.session.scalars(
+        select(Attachment.filename).join(Post, Post.id == Attachment.post_id)
+        .join(Blog, Blog.id == Post.blog_id).where(Blog.owner_id == user_id)
+    )
+    upload_folder = config['UPLOAD_FOLDER']
+    total = 0
+    for filename in filenames:
+        try:
+            total += os.path.getsize(os.path.join(upload_folder, filename))
+        except OSError:
+            continue
+        if total > config['EXPORT_STREAM_MAX_BYTES']:
+            return False
+    return True
+
+
+def export_filename(user):
+    return f'dailypage-export-{user.id}-{time.strftime("%Y%m%d")}.zip'
+
+
+# ---------------- Фоновая сборка ----------------
+
+def user_export_folder(user_id):
+    return os.path.join(current_app.config['EXPORT_FOLDER'], str(user_id))
+
+
+def _is_abandoned(path, mtime):
+    """Никто не пишет этот .part: процесс, собиравший архив, завершился"""
+    if fcntl is None:
+        return mtime < time.time() - STALE_PART_SECONDS
+    with open(path, 'rb') as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+    return True
+
+
+def _mark_failed(folder, token):
+    open(os.path.join(folder, f'{token}.failed'), 'wb').close()
+    part = os.path.join(folder, f'{token}.zip.part')
+    if os.path.exists(part):
+        os.remove(part)
+
+
+def list_exports(user):
+    """Архивы пользователя: [{'token', 'ready', 'failed', 'size', 'created_at'}], новые сверху"""
+    folder = user_export_folder(user.id)
+    if not os.path.isdir(folder):
+        return []
+    exports = []
+    for name in os.listdir(folder):
+        token, _, extension = name.partition('.')
+        if not TOKEN_RE.match(token) or extension not in ('zip', 'zip.part', 'failed'):
+            continue
+        path = os.path.join(folder, name)
+        try:
+            stat = os.stat(path)
+            failed = extension == 'failed'
+            if extension == 'zip.part' and _is_abandoned(path, stat.st_mtime):
+                _mark_failed(folder, token)
+                failed = True
+        except FileNotFoundError:
+            # Сборка закончилась, пока читался список: архив появится при следующем запросе
+            continue
+        exports.append({
+            'token': token,
+            'ready': extension == 'zip',
+            'failed': failed,
+            'size': stat.st_size,
+            'created_at': datetime.fromtimestamp(stat.st_mtime),
+        })
+    return sorted(exports, key=lambda export: export['created_at'], reverse=True)
+
+
+def export_path(user, token):
+    """Путь к готовому архиву или None"""
+    if not TOKEN_RE.match(token):
+        return None
+    path = os.path.join(user_export_folder(user.id), f'{token}.zip')
+    return path if os.path.isfile(path) else None
+
+
+def _open_part(path):
+    """Создает <token>.zip.part и блокирует его на время сборки"""
+    f = open(path, 'wb')
+    if fcntl is not None:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    return f
+
+
+def build_export(user_id, token, part=None):
+    """Собирает архив в EXPORT_FOLDER; пока сборка идет, файл называется <token>.zip.part.
+
+    part — уже открытый и заблокированный .part (start_export держит блокировку,
+    пока задача ждет в очереди); файл закрывается, только когда архив готов.
+    """
+    folder = user_export_folder(user_id)
+    path = os.path.join(folder, f'{token}.zip')
+    f = part or _open_part(f'{path}.part')
+    try:
+        for data in iter_export(user_id):
+            f.write(data)
+        f.flush()
+        os.replace(f'{path}.part', path)
+    except BaseException:
+        _mark_failed(folder, token)
+        raise
+    finally:
+        f.close()
+
+
+def start_export(user):
+    """Запускает фоновую сборку архива; возвращает False, если сборка для пользователя уже идет"""
+    if any(not export['ready'] and not export['failed'] for export in list_exports(user)):
+        return False
+    folder = user_export_folder(user.id)
+    os.makedirs(folder, exist_ok=True)
+    token = uuid.uuid4().hex
+    # Файл создается сразу, чтобы повторный запрос увидел идущую сборку
+    part = _open_part(os.path.join(folder, f'{token}.zip.part'))
+    try:
+        background.submit(build_export, user.id, token, part, pool='exports')
+    except BaseException:
+        part.close()
+        _mark_failed(folder, token)
+        raise
+    return True
+
+
+def cleanup_exports():
+    """Удаляет архивы старше EXPORT_TTL_HOURS; возвращает число удаленных файлов"""
+    root = current_app.config['EXPORT_FOLDER']
+    if not os.path.isdir(root):
+        return 0
+    cutoff = time.time() - current_app.config['EXPORT_TTL_HOURS'] * 3600
+    removed = 0
+    for user_folder in os.listdir(root):
+        folder = os.path.join(root, user_folder)
+        if not os.path.isdir(folder):
+            continue
+        for name in os.listdir(folder):
+            path = os.path.join(folder, name)
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+    return removed
+
+
+def init_exports(app):
+    app.cli.add_command(exports_cli)
+
+
+@exports_cli.command('cleanup')
+def cleanup_command():
+    """Удаляет устаревшие архивы экспорта"""
+    count = cleanup_exports()
+    click.echo(f'Удалено архивов: {count}')
@@ -1,9 +1,8 @@
 # forms.py
 from flask_wtf import FlaskForm
-from wtforms import StringField, TextAreaField, PasswordField, SubmitField
+from wtforms import StringField, TextAreaField, PasswordField, SubmitField, MultipleFileField
 from wtforms.validators import DataRequired, Email, Length, EqualTo, ValidationError
 from app.models import User
-from flask_wtf.file import FileField, FileAllowed  # Убрали MultipleFileField
 from flask_login import current_user
 
 class RegistrationForm(FlaskForm):
@@ -36,11 +35,8 @@ class BlogForm(FlaskForm):
 class PostForm(FlaskForm):
     title = StringField('Название поста', validators=[DataRequired(), Length(min=1, max=150)])
     content = TextAreaField('Содержание поста', validators=[DataRequired()])
-    # Для множественной загрузки используем обычное FileField
-    attachment = FileField('Прикрепить файлы (фото/музыка/видео)', validators=[
-        FileAllowed(['jpg', 'jpeg', 'png', 'gif', 'mp3', 'wav', 'ogg', 'mp4', 'mov', 'avi'], 
-                    'Разрешены только файлы изображений, аудио и видео.')
-    ])
+    # Несколько файлов за раз; расширение, MIME-тип и размер каждого проверяются в validate_file_upload
+    attachment = MultipleFileField('Прикрепить файлы (фото/музыка/видео)')
     submit = SubmitField('Сохранить пост')
 
 class CommentForm(FlaskForm):
@@ -0,0 +1,150 @@
+# app/metrics.py
+import os
+import random
+import time
+
+from flask import Response, g, has_request_context, request, template_rendered, before_render_template
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, REGISTRY, generate_latest, multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Метрики пишутся в общий каталог PROMETHEUS_MULTIPROC_DIR (см. gunicorn_config.py),
+# поэтому /metrics в любом воркере отдает сумму по всем воркерам
+
+REQUESTS = Counter(
+    'http_requests_total', 'Количество HTTP-запросов',
+    ['endpoint', 'method', 'status'],
+)
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Время обработки запроса (выборочно)',
+    ['endpoint', 'method'],
+)
+DB_TIME = Histogram(
+    'http_request_db_seconds', 'Суммарное время SQL-запросов за HTTP-запрос (выборочно)',
+    ['endpoint'],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+DB_QUERIES = Histogram(
+    'http_request_db_queries', 'Количество SQL-запросов за HTTP-запрос (выборочно)',
+    ['endpoint'],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+TEMPLATE_RENDER = Histogram(
+    'template_render_seconds', 'Время рендеринга шаблона Jinja (выборочно)',
+    ['template'],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+UPLOAD_SIZE = Histogram(
+    'upload_size_bytes', 'Размер загруженных файлов',
+    ['file_type'],
+    buckets=(10 * 1024, 100 * 1024, 1024 ** 2, 5 * 1024 ** 2, 10 * 1024 ** 2, 25 * 1024 ** 2, 50 * 1024 ** 2),
+)
+UPLOADED_FILE_BYTES = Counter(
+    'uploaded_file_bytes_total', 'Байт отдано маршрутом uploaded_file',
+)
+PASSWORD_HASH_TIME = Histogram(
+    'password_hash_seconds', 'Время хеширования или проверки пароля',
+    ['operation'],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+PASSWORD_HASH_REJECTED = Counter(
+    'password_hash_rejected_total', 'Запросов, не получивших слот хеширования паролей',
+)
+
+
+def _sampled():
+    return has_request_context() and g.get('metrics_sampled', False)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _sampled():
+        g.metrics_query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _sampled() and 'metrics_query_start' in g:
+        g.metrics_db_time += time.perf_counter() - g.pop('metrics_query_start')
+        g.metrics_db_queries += 1
+
+
+def _before_render(sender, template, context, **extra):
+    if _sampled():
+        g.metrics_render_start = time.perf_counter()
+
+
+def _after_render(sender, template, context, **extra):
+    if _sampled() and 'metrics_render_start' in g:
+        TEMPLATE_RENDER.labels(template.name).observe(time.perf_counter() - g.pop('metrics_render_start'))
+
+
+def _start_request(sample_rate):
+    g.metrics_start = time.perf_counter()
+    g.metrics_sampled = random.random() < sample_rate
+    g.metrics_db_time = 0.0
+    g.metrics_db_queries = 0
+
+
+def _finish_request(response):
+    if 'metrics_start' not in g:
+        return response
+    endpoint = request.endpoint or 'unknown'
+    REQUESTS.labels(endpoint, request.method, response.status_code).inc()
+    if g.metrics_sampled:
+        REQUEST_LATENCY.labels(endpoint, request.method).observe(time.perf_counter() - g.metrics_start)
+        DB_TIME.labels(endpoint).observe(g.metrics_db_time)
+        DB_QUERIES.labels(endpoint).observe(g.metrics_db_queries)
+    return response
+
+
+def observe_upload(size, file_type):
+    """Учитывает размер загруженного файла"""
+    UPLOAD_SIZE.labels(file_type).observe(size)
+
+
+def observe_file_served(size):
+    """Учитывает байты, отданные маршрутом uploaded_file"""
+    UPLOADED_FILE_BYTES.inc(size)
+
+
+def observe_password_hash(operation, seconds):
+    """Учитывает время хеширования (operation='hash') или проверки ('check') пароля"""
+    PASSWORD_HASH_TIME.labels(operation).observe(seconds)
+
+
+def observe_password_rejected():
+    """Учитывает запрос, отклоненный из-за занятых слотов хеширования"""
+    PASSWORD_HASH_REJECTED.inc()
+
+
+def metrics_view():
+    """Метрики в текстовом формате Prometheus"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+
+def init_metrics(app):
+    """Подключает сбор метрик и маршрут /metrics"""
+    if not app.config['METRICS_ENABLED']:
+        return
+
+    sample_rate = app.config['METRICS_SAMPLE_RATE']
+
+    @app.before_request
+    def start_request_metrics():
+        _start_request(sample_rate)
+
+    app.after_request(_finish_request)
+
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
@@ -12,7 +12,8 @@ def load_user(user_id):
 post_tags = db.Table(
     'post_tags',
     db.Column('post_id', db.Integer, db.ForeignKey('post.id', ondelete='CASCADE'), primary_key=True),
-    db.Column('tag_id', db.Integer, db.ForeignKey('tag.id', ondelete='CASCADE'), primary_key=True)
+    db.Column('tag_id', db.Integer, db.ForeignKey('tag.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('ix_post_tags_tag_id', 'tag_id') # Посты по тегу (похожие посты)
 )
 
 class User(db.Model, UserMixin):
@@ -21,6 +22,7 @@ class User(db.Model, UserMixin):
     email = db.Column(db.String(120), unique=True, nullable=False)
     password = db.Column(db.String(200), nullable=False)
     role = db.Column(db.String(20), default='reader') # Роль пользователя
+    unread_notifications = db.Column(db.Integer, nullable=False, default=0, server_default='0') # Кеш числа непрочитанных уведомлений
     
     # ИСПРАВЛЕНО: Добавлено cascade='all, delete-orphan'
     blogs = db.relationship('Blog', backref='owner', lazy=True, cascade='all, delete-orphan') 
@@ -30,6 +32,7 @@ class User(db.Model, UserMixin):
     likes = db.relationship('Like', backref='user', lazy=True, cascade='all, delete-orphan') 
     subscriptions = db.relationship('Subscription', backref='subscriber', lazy=True, cascade='all, delete-orphan') 
     uploaded_attachments = db.relationship('Attachment', backref='uploader', lazy=True, foreign_keys='Attachment.user_id', cascade='all, delete-orphan')
+    notifications = db.relationship('Notification', backref='user', lazy='dynamic', cascade='all, delete-orphan', passive_deletes=True)
 
     def __repr__(self):
         return f"User('{self.username}', '{self.email}', 'Role: {self.role}')"
@@ -44,6 +47,11 @@ class Blog(db.Model):
     posts = db.relationship('Post', backref='blog', lazy=True, cascade='all, delete-orphan') # Посты в этом блоге
     subscribers = db.relationship('Subscription', backref='blog', lazy=True, cascade='all, delete-orphan') # Подписчики блога
 
+    __table_args__ = (
+        db.Index('ix_blog_created_at', 'created_at'), # Главная страница
+        db.Index('ix_blog_owner_id', 'owner_id'), # Блоги пользователя
+    )
+
     @property
     def total_comments(self):
         """Подсчитывает общее количество комментариев во всех постах блога"""
@@ -62,6 +70,11 @@ class Post(db.Model):
     title = db.Column(db.String(150), nullable=False) # Заголовок поста
     content = db.Column(db.Text, nullable=False) # Содержание поста
     created_at = db.Column(db.DateTime, default=datetime.utcnow) # Дата создания
+    # Дата последней правки автором (lastmod в карте сайта); задается в edit_post, а не onupdate:
+    # пачки просмотров и отметка рассылки тоже обновляют строку поста
+    updated_at = db.Column(db.DateTime)
+    views = db.Column(db.BigInteger, nullable=False, default=0, server_default='0') # Просмотры (записываются пачками, см. app/post_views.py)
+    notify_pending = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false()) # Рассылка уведомлений еще не закончена
     
     comments = db.relationship('Comment', backref='post', lazy=True, cascade='all, delete-orphan') # Комментарии к посту
     likes = db.relationship('Like', backref='post', lazy=True, cascade='all, delete-orphan') # Лайки к посту
@@ -70,6 +83,12 @@ class Post(db.Model):
     # Новое отношение для прикрепленных файлов
     attachments = db.relationship('Attachment', backref='post', lazy=True, cascade='all, delete-orphan', foreign_keys='Attachment.post_id') 
 
+    __table_args__ = (
+        db.Index('ix_post_blog_id_created_at', 'blog_id', 'created_at'), # Посты блога по дате
+        db.Index('ix_post_notify_pending', 'created_at',
+                 postgresql_where=db.text('notify_pending'), sqlite_where=db.text('notify_pending')), # Незаконченные рассылки
+    )
+
     @property
     def read_time(self):
         """Вычисляет примерное время чтения поста (в минутах)"""
@@ -93,6 +112,11 @@ class Attachment(db.Model):
     mimetype = db.Column(db.String(100), nullable=False) # MIME-тип файла
     file_type = db.Column(db.String(10), nullable=False) # Тип: 'image', 'video', 'audio', 'other'
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_attachment_filename', 'filename'), # Поиск по имени в uploaded_file
+        db.Index('ix_attachment_post_id', 'post_id'), # Вложения поста
+    )
     
     def __repr__(self):
         return f"Attachment('{self.filename}', 'Post ID: {self.post_id}', 'Type: {self.file_type}')"
@@ -110,7 +134,12 @@ class Comment(db.Model):
     post_id = db.Column(db.Integer, db.ForeignKey('post.id', ondelete='CASCADE'), nullable=False) # Внешний ключ на пост
     user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False) # Внешний ключ на пользователя-автора
     content = db.Column(db.Text, nullable=False) # Содержание комментария
-    created_at = db.Column(db.DateTime, default=datetime.utcnow) # Дата создания
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow) # Дата создания
+
+    __table_args__ = (
+        db.Index('ix_comment_post_id_created_at', 'post_id', 'created_at'), # Комментарии поста по дате
+        db.Index('ix_comment_created_at', 'created_at'), # Пересчет рейтинга за окно
+    )
 
     def __repr__(self):
         return f"Comment('{self.content}', '{self.created_at}')"
@@ -119,7 +148,13 @@ class Like(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     post_id = db.Column(db.Integer, db.ForeignKey('post.id', ondelete='CASCADE'), nullable=False) # Внешний ключ на пост
     user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False) # Внешний ключ на пользователя
-    created_at = db.Column(db.DateTime, default=datetime.utcnow) # Дата создания лайка
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow) # Дата создания лайка
+
+    __table_args__ = (
+        db.Index('uq_like_user_id_post_id', 'user_id', 'post_id', unique=True), # Один лайк на пользователя
+        db.Index('ix_like_post_id', 'post_id'), # Лайки поста
+        db.Index('ix_like_created_at', 'created_at'), # Пересчет рейтинга за окно
+    )
 
     def __repr__(self):
         return f"Like('{self.user_id}', '{self.post_id}')"
@@ -130,5 +165,79 @@ class Subscription(db.Model):
     blog_id = db.Column(db.Integer, db.ForeignKey('blog.id', ondelete='CASCADE'), nullable=False) # Внешний ключ на блог
     created_at = db.Column(db.DateTime, default=datetime.utcnow) # Дата подписки
 
+    __table_args__ = (
+        db.Index('uq_subscription_user_id_blog_id', 'user_id', 'blog_id', unique=True), # Одна подписка на блог
+        db.Index('ix_subscription_blog_id', 'blog_id'), # Подписчики блога
+    )
+
+    def __repr__(self):
+        return f"Subscription('User: {self.user_id}', 'Blog: {self.blog_id}')"
+
+class PostScore(db.Model):
+    """Рейтинг «популярное сейчас»: log2 суммы затухающих весов лайков и комментариев (см. app/trending.py)"""
+    post_id = db.Column(db.Integer, db.ForeignKey('post.id', ondelete='CASCADE'), primary_key=True) # Пост
+    score = db.Column(db.Float, nullable=False, index=True) # Рейтинг относительно TRENDING_EPOCH
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow) # Последнее обновление
+
+    post = db.relationship('Post', backref=db.backref('trending_score', uselist=False, cascade='all, delete-orphan'))
+
+    def __repr__(self):
+        return f"PostScore('Post ID: {self.post_id}', 'Score: {self.score}')"
+
+
+class RelatedPost(db.Model):
+    """Предрасчитанные похожие посты (сходство Жаккара по тегам, см. app/related.py)"""
+    post_id = db.Column(db.Integer, db.ForeignKey('post.id', ondelete='CASCADE'), primary_key=True) # Пост
+    related_post_id = db.Column(db.Integer, db.ForeignKey('post.id', ondelete='CASCADE'), primary_key=True) # Похожий пост
+    score = db.Column(db.Float, nullable=False) # Сходство Жаккара по тегам
+
+    __table_args__ = (
+        db.Index('ix_related_post_post_id_score', 'post_id', 'score'),
+        db.Index('ix_related_post_related_post_id', 'related_post_id'), # Пересчет и удаление поста
+    )
+
+    def __repr__(self):
+        return f"RelatedPost('Post ID: {self.post_id}', 'Related ID: {self.related_post_id}', 'Score: {self.score}')"
+
+
+class UploadSession(db.Model):
+    """Незавершенная возобновляемая загрузка файла (см. app/uploads.py)"""
+    id = db.Column(db.String(32), primary_key=True) # Идентификатор сессии (uuid4)
+    post_id = db.Column(db.Integer, db.ForeignKey('post.id', ondelete='CASCADE'), nullable=False) # К какому посту будет прикреплен файл
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False) # Кто загружает файл
+    original_filename = db.Column(db.String(255), nullable=False) # Исходное имя файла
+    mimetype = db.Column(db.String(100), nullable=False) # Проверенный MIME-тип
+    file_type = db.Column(db.String(10), nullable=False) # Тип: 'image', 'video', 'audio', 'document'
+    total_size = db.Column(db.BigInteger, nullable=False) # Полный размер файла в байтах
+    offset = db.Column(db.BigInteger, nullable=False, default=0) # Сколько байт уже получено
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True) # Для удаления брошенных сессий
+
+    def __repr__(self):
+        return f"UploadSession('{self.id}', '{self.offset}/{self.total_size}')"
+
+
+class Notification(db.Model):
+    """Уведомление подписчика о новом посте в блоге (см. app/notifications.py)"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False) # Получатель
+    post_id = db.Column(db.Integer, db.ForeignKey('post.id', ondelete='CASCADE'), nullable=False) # Новый пост
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    read_at = db.Column(db.DateTime) # Когда пользователь открыл уведомление
+    emailed_at = db.Column(db.DateTime) # Когда уведомление ушло в письме-дайджесте
+
+    post = db.relationship('Post', backref=db.backref('notifications', lazy='dynamic', cascade='all, delete-orphan', passive_deletes=True))
+
+    __table_args__ = (
+        db.Index('uq_notification_user_id_post_id', 'user_id', 'post_id', unique=True), # Повторная рассылка не дублирует уведомления
+        db.Index('ix_notification_user_id_id', 'user_id', 'id'), # Страница уведомлений (keyset-пагинация)
+        db.Index('ix_notification_post_id', 'post_id'), # Каскадное удаление поста
+        db.Index('ix_notification_unread', 'user_id',
+                 postgresql_where=db.text('read_at IS NULL'), sqlite_where=db.text('read_at IS NULL')), # Непрочитанные
+        db.Index('ix_notification_pending_email', 'user_id',
+                 postgresql_where=db.text('emailed_at IS NULL AND read_at IS NULL'),
+                 sqlite_where=db.text('emailed_at IS NULL AND read_at IS NULL')), # Ожидают дайджеста
+    )
+
     def __repr__(self):
-        return f"Subscription('User: {self.user_id}', 'Blog: {self.blog_id}')"
\ No newline at end of file
+        return f"Notification('User: {self.user_id}', 'Post: {self.post_id}')"
@@ -0,0 +1,296 @@
+# app/notifications.py
+"""Уведомления подписчиков о новых постах.
+
+Рассылка (fan-out) идет вне запроса: new_post только ставит задачу в фоновый
+поток воркера. Подписчики блога читаются пачками по NOTIFY_CHUNK_SIZE
+(keyset по subscription.id), уведомления вставляются одним INSERT на пачку,
+а кеш непрочитанных user.unread_notifications увеличивается одним UPDATE.
+Повторный запуск для того же поста безопасен: уже уведомленные пропускаются.
+
+Очередь фоновых задач живет в памяти воркера и пропадает при его перезапуске,
+поэтому пост создается с отметкой post.notify_pending, которую fan_out снимает
+после последней пачки. `flask notifications retry-pending` (по расписанию)
+повторяет рассылки, отмеченные дольше NOTIFY_RETRY_AFTER секунд назад.
+
+Письма не отправляются на каждый пост. `flask notifications send-digests`
+(запускается по расписанию) собирает все неотправленные и непрочитанные
+уведомления пользователя в одно письмо-дайджест, поэтому серия постов
+превращается в одно письмо. Письма отправляются пачками через ограниченное
+число SMTP-соединений (NOTIFY_SMTP_CONNECTIONS).
+"""
+import smtplib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+
+import click
+from flask import current_app, url_for
+from flask.cli import AppGroup
+from sqlalchemy import func, insert, select, update
+
+from app import background, db
+from app.models import Blog, Notification, Post, Subscription, User
+
+notifications_cli = AppGroup('notifications', help='Уведомления подписчиков.')
+
+
+def fan_out(post_id):
+    """Создает уведомления о посте для всех подписчиков блога; возвращает их число"""
+    post = db.session.get(Post, post_id)
+    if post is None:
+        return 0
+
+    chunk_size = current_app.config['NOTIFY_CHUNK_SIZE']
+    created = 0
+    last_id = 0
+    while True:
+        chunk = db.session.execute(
+            select(Subscription.id, Subscription.user_id)
+            .where(Subscription.blog_id == post.blog_id, Subscription.id > last_id)
+            .order_by(Subscription.id)
+            .limit(chunk_size)
+        ).all()
+        if not chunk:
+            break
+        last_id = chunk[-1].id
+
+        user_ids = [row.user_id for row in chunk]
+        notified = set(db.session.scalars(
+            select(Notification.user_id)
+            .where(Notification.post_id == post.id, Notification.user_id.in_(user_ids))
+        ))
+        user_ids = [user_id for user_id in user_ids if user_id not in notified]
+        if user_ids:
+            now = datetime.utcnow()
+            db.session.execute(
+                insert(Notification),
+                [{'user_id': user_id, 'post_id': post.id, 'created_at': now} for user_id in user_ids],
+            )
+            db.session.execute(
+                update(User)
+                .where(User.id.in_(user_ids))
+                .values(unread_notifications=User.unread_notifications + 1)
+            )
+        # Коммит на каждую пачку: короткие транзакции и прогресс, не теряемый при сбое
+        db.session.commit()
+        created += len(user_ids)
+
+    db.session.execute(update(Post).where(Post.id == post.id).values(notify_pending=False))
+    db.session.commit()
+    return created
+
+
+def retry_pending():
+    """Повторяет рассылки, прерванные перезапуском воркера; возвращает число постов"""
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config['NOTIFY_RETRY_AFTER'])
+    post_ids = db.session.scalars(
+        select(Post.id).where(Post.notify_pending.is_(True), Post.created_at < cutoff).order_by(Post.created_at)
+    ).all()
+    for post_id in post_ids:
+        fan_out(post_id)
+    return len(post_ids)
+
+
+def notify_subscribers(post):
+    """Запускает рассылку уведомлений о новом посте (вызывать после коммита поста)"""
+    if current_app.config['NOTIFY_ASYNC']:
+        background.submit(fan_out, post.id)
+    else:
+        fan_out(post.id)
+
+
+def mark_read(user, notification):
+    """Отмечает уведомление прочитанным и уменьшает кеш непрочитанных"""
+    result = db.session.execute(
+        update(Notification)
+        .where(Notification.id == notification.id, Notification.read_at.is_(None))
+        .values(read_at=datetime.utcnow())
+    )
+    if result.rowcount:
+        db.session.execute(
+            update(User)
+            .where(User.id == user.id, User.unread_notifications > 0)
+            .values(unread_notifications=User.unread_notifications - 1)
+        )
+    db.session.commit()
+
+
+def mark_all_read(user):
+    db.session.execute(
+        update(Notification)
+        .where(Notification.user_id == user.id, Notification.read_at.is_(None))
+        .values(read_at=datetime.utcnow())
+    )
+    user.unread_notifications = 0
+    db.session.commit()
+
+
+def sync_unread_count(user):
+    """Пересчитывает кеш непрочитанных (он мог разойтись, например, после удаления постов)"""
+    count = db.session.scalar(
+        select(func.count()).select_from(Notification)
+        .where(Notification.user_id == user.id, Notification.read_at.is_(None))
+    )
+    if count != user.unread_notifications:
+        user.unread_notifications = count
+        db.session.commit()
+    return count
+
+
+def notifications_page(user, before_id=None):
+    """Страница уведомлений, новые сверху; возвращает (уведомления, id для следующей страницы или None)"""
+    per_page = current_app.config['NOTIFICATIONS_PER_PAGE']
+    query = (
+        Notification.query
+        .join(Notification.post)
+        .join(Post.blog)
+        .filter(Notification.user_id == user.id)
+        .options(db.contains_eager(Notification.post).contains_eager(Post.blog))
+        .order_by(Notification.id.desc())
+    )
+    if before_id is not None:
+        query = query.filter(Notification.id < before_id)
+    items = query.limit(per_page + 1).all()
+    next_before = items[per_page - 1].id if len(items) > per_page else None
+    return items[:per_page], next_before
+
+
+# ---------------- Письма-дайджесты ----------------
+
+def _digest_message(user, items, sender):
+    message = EmailMessage()
+    message['From'] = sender
+    message['To'] = user.email
+    if len(items) == 1:
+        message['Subject'] = f'Новый пост: {items[0].post_title}'
+    else:
+        message['Subject'] = f'Новых постов в ваших подписках: {len(items)}'
+
+    lines = [f'Здравствуйте, {user.username}!', '', 'В блогах, на которые вы подписаны, появились новые посты:', '']
+    for item in items:
+        lines.append(f'- {item.blog_title}: {item.post_title}')
+        lines.append(f'  {url_for("main.post", post_id=item.post_id, _external=True)}')
+    lines += ['', f'Все уведомления: {url_for("main.notifications_list", _external=True)}']
+    message.set_content('\n'.join(lines))
+    return message
+
+
+def _send_batch(config, messages):
+    """Отправляет письма через одно SMTP-соединение.
+
+    Возвращает (id получателей, чьи письма обработаны, ошибка соединения или None).
+    """
+    delivered = []
+    try:
+        with smtplib.SMTP(config['MAIL_SERVER'], config['MAIL_PORT'], timeout=config['MAIL_TIMEOUT']) as smtp:
+            if config['MAIL_USE_TLS']:
+                smtp.starttls()
+            if config['MAIL_USERNAME']:
+                smtp.login(config['MAIL_USERNAME'], config['MAIL_PASSWORD'])
+            for user_id, message in messages:
+                try:
+                    smtp.send_message(message)
+                except smtplib.SMTPRecipientsRefused:
+                    # Адрес не принимается сервером: повторная отправка не поможет
+                    pass
+                except smtplib.SMTPResponseException:
+                    # Временная ошибка для одного письма: оно уйдет при следующем запуске
+                    continue
+                delivered.append(user_id)
+    except (OSError, smtplib.SMTPException) as e:
+        return delivered, e
+    return delivered, None
+
+
+def _deliver(messages):
+    """Распределяет письма по NOTIFY_SMTP_CONNECTIONS соединениям; возвращает id получателей с доставленными письмами"""
+    if not messages:
+        return []
+    config = current_app.config
+    connections = min(config['NOTIFY_SMTP_CONNECTIONS'], len(messages))
+    batches = [messages[i::connections] for i in range(connections)]
+    delivered = []
+    with ThreadPoolExecutor(max_workers=connections) as pool:
+        for batch_delivered, error in pool.map(lambda batch: _send_batch(config, batch), batches):
+            delivered.extend(batch_delivered)
+            if error is not None:
+                # Неотправленные письма пачки останутся в очереди до следующего запуска
+                current_app.logger.warning('Не удалось отправить дайджесты: %s', error)
+    return delivered
+
+
+def send_digests():
+    """Отправляет каждому пользователю одно письмо со всеми новыми уведомлениями; возвращает число писем"""
+    batch_size = current_app.config['NOTIFY_DIGEST_BATCH_SIZE']
+    sender = current_app.config['MAIL_DEFAULT_SENDER']
+    pending = (Notification.emailed_at.is_(None), Notification.read_at.is_(None))
+    sent = 0
+    last_user_id = 0
+    while True:
+        user_ids = db.session.scalars(
+            select(Notification.user_id).distinct()
+            .where(*pending, Notification.user_id > last_user_id)
+            .order_by(Notification.user_id)
+            .limit(batch_size)
+        ).all()
+        if not user_ids:
+            break
+        last_user_id = user_ids[-1]
+
+        rows = db.session.execute(
+            select(Notification.id, Notification.user_id, Notification.post_id,
+                   Post.title.label('post_title'), Blog.title.label('blog_title'))
+            .join(Post, Post.id == Notification.post_id)
+            .join(Blog, Blog.id == Post.blog_id)
+            .where(*pending, Notification.user_id.in_(user_ids))
+            .order_by(Notification.id)
+        ).all()
+        by_user = {}
+        for row in rows:
+            by_user.setdefault(row.user_id, []).append(row)
+        users = {user.id: user for user in User.query.filter(User.id.in_(by_user))}
+
+        # Ссылки в письмах строятся от SITE_URL: команда работает вне запроса
+        with current_app.test_request_context(base_url=current_app.config['SITE_URL']):
+            messages = [(user_id, _digest_message(users[user_id], items, sender))
+                        for user_id, items in by_user.items() if user_id in users]
+        delivered = set(_deliver(messages))
+        notification_ids = [row.id for row in rows if row.user_id in delivered]
+        if notification_ids:
+            db.session.execute(
+                update(Notification)
+                .where(Notification.id.in_(notification_ids))
+                .values(emailed_at=datetime.utcnow())
+            )
+        db.session.commit()
+        sent += len(delivered)
+    return sent
+
+
+def init_notifications(app):
+    app.cli.add_command(notifications_cli)
+
+
+@notifications_cli.command('fanout')
+@click.argument('post_id', type=int)
+def fanout_command(post_id):
+    """Повторяет рассылку уведомлений о посте (уже уведомленные пропускаются)"""
+    count = fan_out(post_id)
+    click.echo(f'Создано уведомлений: {count}')
+
+
+@notifications_cli.command('retry-pending')
+def retry_pending_command():
+    """Повторяет незаконченные рассылки уведомлений (запускать по расписанию)"""
+    count = retry_pending()
+    click.echo(f'Повторено рассылок: {count}')
+
+
+@notifications_cli.command('send-digests')
+def send_digests_command():
+    """Отправляет письма-дайджесты о новых постах"""
+    if not current_app.config['NOTIFY_EMAIL_ENABLED']:
+        click.echo('Отправка писем отключена (NOTIFY_EMAIL_ENABLED).')
+        return
+    count = send_digests()
+    click.echo(f'Отправлено писем: {count}')
@@ -0,0 +1,310 @@
+# app/partitioning.py
+"""Секционирование comment и like по месяцам created_at (PostgreSQL).
+
+`flask partitions enable` один раз переводит таблицы на декларативное
+секционирование RANGE (created_at): данные переносятся в секции вида
+comment_p2026_10, а строки вне созданных месяцев попадают в секцию по
+умолчанию (comment_default), поэтому вставка никогда не падает.
+`flask partitions maintain` (create_tables.py и ежедневный cron) создает секции
+на PARTITION_MONTHS_AHEAD месяцев вперед и переносит строки из секции по умолчанию
+в их собственные секции. `flask partitions archive` отсоединяет старые секции
+и переносит их в схему PARTITION_ARCHIVE_SCHEMA (или удаляет).
+
+Модели и запросы не меняются: индексы создаются на родительской таблице и есть
+в каждой секции. Ключи секционированной таблицы обязаны включать created_at,
+поэтому первичный ключ в БД становится (id, created_at), а уникальность лайка
+(user_id, post_id) обеспечивает like_post под advisory-блокировкой (lock_like).
+Блокировка на PostgreSQL берется всегда, поэтому воркеры, запущенные до
+`flask partitions enable`, не нужно перезапускать. Автогенерация миграций
+не видит секций и замены индекса лайков (include_object в migrations/env.py).
+
+На SQLite и других СУБД команды ничего не делают: таблицы остаются обычными.
+"""
+import re
+from datetime import datetime
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import text
+
+from app import db
+
+partitions_cli = AppGroup('partitions', help='Секционирование комментариев и лайков.')
+
+# Индекс лайков вместо уникального uq_like_user_id_post_id из модели
+PARTITIONED_LIKE_INDEX = 'ix_like_user_id_post_id'
+UNIQUE_LIKE_INDEX = 'uq_like_user_id_post_id'
+
+# Колонки секционированных таблиц (кроме id и created_at) и индексы родительской таблицы
+PARTITIONED_TABLES = {
+    'comment': {
+        'columns': [
+            'post_id integer NOT NULL CONSTRAINT comment_post_id_fkey REFERENCES post (id) ON DELETE CASCADE',
+            'user_id integer NOT NULL CONSTRAINT comment_user_id_fkey REFERENCES "user" (id) ON DELETE CASCADE',
+            'content text NOT NULL',
+        ],
+        'indexes': {
+            'ix_comment_post_id_created_at': ['post_id', 'created_at'],
+            'ix_comment_created_at': ['created_at'],
+        },
+    },
+    'like': {
+        'columns': [
+            'post_id integer NOT NULL CONSTRAINT like_post_id_fkey REFERENCES post (id) ON DELETE CASCADE',
+            'user_id integer NOT NULL CONSTRAINT like_user_id_fkey REFERENCES "user" (id) ON DELETE CASCADE',
+        ],
+        'indexes': {
+            # Уникальный индекс без created_at невозможен, см. lock_like
+            PARTITIONED_LIKE_INDEX: ['user_id', 'post_id'],
+            'ix_like_post_id': ['post_id'],
+            'ix_like_created_at': ['created_at'],
+        },
+    },
+}
+
+PARTITION_RE = re.compile(r'^(?:comment|like)_(?:p\d{4}_\d{2}|default)$')
+
+
+def _is_postgresql():
+    return db.engine.dialect.name == 'postgresql'
+
+
+def _month_start(value):
+    return datetime(value.year, value.month, 1)
+
+
+def _add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table, month):
+    return f'{table}_p{month:%Y_%m}'
+
+
+def is_partitioned(table):
+    if not _is_postgresql():
+        return False
+    return db.session.scalar(
+        text('SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table))'),
+        {'table': f'"{table}"'},
+    )
+
+
+def list_partitions(table):
+    """Месячные секции таблицы: [(имя, начало месяца)] по возрастанию"""
+    names = db.session.scalars(text(
+        'SELECT child.relname FROM pg_inherits '
+        'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+        'WHERE pg_inherits.inhparent = to_regclass(:table)'
+    ), {'table': f'"{table}"'})
+    pattern = re.compile(rf'^{re.escape(table)}_p(\d{{4}})_(\d{{2}})$')
+    partitions = []
+    for name in names:
+        match = pattern.match(name)
+        if match:
+            partitions.append((name, datetime(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def create_partition(table, month):
+    """Создает секцию за месяц month; возвращает False, если она уже есть"""
+    name = partition_name(table, month)
+    if db.session.scalar(text('SELECT to_regclass(:name)'), {'name': f'"{name}"'}) is not None:
+        return False
+
+    bounds = f"FROM ('{month:%Y-%m-%d}') TO ('{_add_months(month, 1):%Y-%m-%d}')"
+    in_month = {'start': month, 'end': _add_months(month, 1)}
+    has_default_rows = db.session.scalar(text(
+        f'SELECT EXISTS (SELECT 1 FROM "{table}_default" WHERE created_at >= :start AND created_at < :end)'
+    ), in_month)
+
+    if not has_default_rows:
+        db.session.execute(text(f'CREATE TABLE "{name}" PARTITION OF "{table}" FOR VALUES {bounds}'))
+        return True
+
+    # Секцию нельзя создать, пока ее строки лежат в секции по умолчанию:
+    # строки переносятся в отдельную таблицу, которая затем присоединяется как секция
+    db.session.execute(text(f'CREATE TABLE "{name}" (LIKE "{table}" INCLUDING DEFAULTS)'))
+    db.session.execute(text(
+        f'WITH moved AS (DELETE FROM "{table}_default" WHERE created_at >= :start AND created_at < :end RETURNING *) '
+        f'INSERT INTO "{name}" SELECT * FROM moved'
+    ), in_month)
+    db.session.execute(text(f'ALTER TABLE "{table}" ATTACH PARTITION "{name}" FOR VALUES {bounds}'))
+    return True
+
+
+def enable_partitioning(table):
+    """Переводит таблицу на секционирование по месяцам; возвращает False, если она уже секционирована.
+
+    Таблица блокируется на время переноса данных.
+    """
+    if is_partitioned(table):
+        return False
+    spec = PARTITIONED_TABLES[table]
+    legacy = f'{table}_unpartitioned'
+    sequence = db.session.scalar(text("SELECT pg_get_serial_sequence(:table, 'id')"), {'table': f'"{table}"'})
+    if sequence is None:
+        raise click.ClickException(f'У таблицы {table} нет последовательности для id.')
+
+    db.session.execute(text(f'LOCK TABLE "{table}" IN ACCESS EXCLUSIVE MODE'))
+    db.session.execute(text(f'ALTER TABLE "{table}" RENAME TO "{legacy}"'))
+    # Имена первичного ключа и индексов освобождаются для новой таблицы
+    db.session.execute(text(f'ALTER TABLE "{legacy}" DROP CONSTRAINT IF EXISTS "{table}_pkey"'))
+    for index in db.metadata.tables[table].indexes:
+        db.session.execute(text(f'DROP INDEX IF EXISTS "{index.name}"'))
+    db.session.execute(text(f'ALTER SEQUENCE {sequence} OWNED BY NONE'))
+
+    columns = ',\n    '.join(spec['columns'])
+    db.session.execute(text(
+        f'CREATE TABLE "{table}" (\n'
+        f"    id integer NOT NULL DEFAULT nextval('{sequence}'),\n"
+        f'    {columns},\n'
+        f"    created_at timestamp without time zone NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),\n"
+        f'    CONSTRAINT "{table}_pkey" PRIMARY KEY (id, created_at)\n'
+        f') PARTITION BY RANGE (created_at)'
+    ))
+    db.session.execute(text(f'ALTER SEQUENCE {sequence} OWNED BY "{table}".id'))
+    db.session.execute(text(f'CREATE TABLE "{table}_default" PARTITION OF "{table}" DEFAULT'))
+
+    # Секции от месяца самой старой строки до PARTITION_MONTHS_AHEAD месяцев вперед
+    oldest = db.session.scalar(text(f'SELECT MIN(created_at) FROM "{legacy}"'))
+    month = _month_start(oldest or datetime.utcnow())
+    last = _add_months(_month_start(datetime.utcnow()), current_app.config['PARTITION_MONTHS_AHEAD'])
+    while month <= last:
+        create_partition(table, month)
+        month = _add_months(month, 1)
+
+    names = ', '.join(['id'] + [column.split()[0] for column in spec['columns']] + ['created_at'])
+    select_names = names.replace('created_at', "COALESCE(created_at, now() AT TIME ZONE 'utc')")
+    db.session.execute(text(f'INSERT INTO "{table}" ({names}) SELECT {select_names} FROM "{legacy}"'))
+    for index_name, index_columns in spec['indexes'].items():
+        db.session.execute(text(f'CREATE INDEX "{index_name}" ON "{table}" ({", ".join(index_columns)})'))
+    db.session.execute(text(f'DROP TABLE "{legacy}"'))
+    db.session.commit()
+    db.session.execute(text(f'ANALYZE "{table}"'))
+    db.session.commit()
+    return True
+
+
+def maintain_partitions():
+    """Создает секции на PARTITION_MONTHS_AHEAD месяцев вперед и для строк из секции по умолчанию.
+
+    Возвращает имена созданных секций.
+    """
+    created = []
+    for table in PARTITIONED_TABLES:
+        if not is_partitioned(table):
+            continue
+        current = _month_start(datetime.utcnow())
+        months = {_add_months(current, offset) for offset in range(current_app.config['PARTITION_MONTHS_AHEAD'] + 1)}
+        months.update(
+            _month_start(month) for month in
+            db.session.scalars(text(f'SELECT DISTINCT date_trunc(\'month\', created_at) FROM "{table}_default"'))
+        )
+        for month in sorted(months):
+            if create_partition(table, month):
+                created.append(partition_name(table, month))
+        db.session.commit()
+    return created
+
+
+def archive_partitions(older_than_months, drop=False):
+    """Отсоединяет секции старше older_than_months месяцев; возвращает их имена.
+
+    Отсоединенные секции переносятся в схему PARTITION_ARCHIVE_SCHEMA
+    (их можно выгрузить через pg_dump) или удаляются при drop=True.
+    """
+    schema = current_app.config['PARTITION_ARCHIVE_SCHEMA']
+    cutoff = _add_months(_month_start(datetime.utcnow()), -older_than_months)
+    archived = []
+    for table in PARTITIONED_TABLES:
+        if not is_partitioned(table):
+            continue
+        for name, month in list_partitions(table):
+            if _add_months(month, 1) > cutoff:
+                break
+            db.session.execute(text(f'ALTER TABLE "{table}" DETACH PARTITION "{name}"'))
+            if drop:
+                db.session.execute(text(f'DROP TABLE "{name}"'))
+            else:
+                db.session.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{schema}"'))
+                db.session.execute(text(f'ALTER TABLE "{name}" SET SCHEMA "{schema}"'))
+            # Каждая секция в своей транзакции: блокировка родительской таблицы короткая
+            db.session.commit()
+            archived.append(name)
+    return archived
+
+
+def lock_like(user_id, post_id):
+    """Сериализует параллельные лайки пользователя одному посту до конца транзакции.
+
+    Нужна для секционированной like, в которой нет уникального индекса (user_id, post_id).
+    Берется на любой таблице PostgreSQL: это дешевле проверки секционирования, и
+    `flask partitions enable` действует на уже запущенные воркеры без перезапуска.
+    """
+    if _is_postgresql():
+        db.session.execute(text('SELECT pg_advisory_xact_lock(:user_id, :post_id)'),
+                           {'user_id': user_id, 'post_id': post_id})
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Фильтр автогенерации миграций (migrations/env.py): скрывает различия из-за секционирования.
+
+    Секции comment_p2026_10, like_default и т.п. не описаны в моделях, а индекс
+    ix_like_user_id_post_id секционированной like заменяет уникальный индекс модели.
+    """
+    if type_ == 'table':
+        return not (reflected and PARTITION_RE.match(name))
+    if type_ == 'index':
+        if reflected and name == PARTITIONED_LIKE_INDEX:
+            return False
+        if not reflected and name == UNIQUE_LIKE_INDEX and compare_to is None:
+            return not is_partitioned('like')
+    return True
+
+
+def init_partitioning(app):
+    app.cli.add_command(partitions_cli)
+
+
+def _require_postgresql():
+    if not _is_postgresql():
+        click.echo('Секционирование поддерживается только в PostgreSQL; используются обычные таблицы.')
+        return False
+    return True
+
+
+@partitions_cli.command('enable')
+def enable_command():
+    """Переводит comment и like на секционирование по месяцам (блокирует таблицы на время переноса)"""
+    if not _require_postgresql():
+        return
+    for table in PARTITIONED_TABLES:
+        if enable_partitioning(table):
+            click.echo(f'Таблица {table} секционирована.')
+        else:
+            click.echo(f'Таблица {table} уже секционирована.')
+
+
+@partitions_cli.command('maintain')
+def maintain_command():
+    """Создает секции на ближайшие месяцы"""
+    if not _require_postgresql():
+        return
+    created = maintain_partitions()
+    click.echo(f'Создано секций: {len(created)}' + (f' ({", ".join(created)})' if created else ''))
+
+
+@partitions_cli.command('archive')
+@click.option('--older-than', 'older_than', type=click.IntRange(min=1), required=True,
+              help='Возраст секций в месяцах.')
+@click.option('--drop', is_flag=True, help='Удалить секции вместо переноса в архивную схему.')
+def archive_command(older_than, drop):
+    """Отсоединяет старые секции комментариев и лайков"""
+    if not _require_postgresql():
+        return
+    archived = archive_partitions(older_than, drop=drop)
+    action = 'Удалено' if drop else f'Перенесено в схему {current_app.config["PARTITION_ARCHIVE_SCHEMA"]}'
+    click.echo(f'{action} секций: {len(archived)}' + (f' ({", ".join(archived)})' if archived else ''))
@@ -0,0 +1,175 @@
+# app/passwords.py
+"""Хеширование паролей с ограничением нагрузки.
+
+Параметры хеша задаются в PASSWORD_HASH_METHOD (формат werkzeug, например
+scrypt:32768:8:1 или pbkdf2:sha256:600000); `flask passwords benchmark`
+показывает время одного хеша для нескольких вариантов на этом сервере.
+
+Хеширование занимает процессор на десятки миллисекунд, поэтому одновременно
+его выполняют не больше PASSWORD_HASH_CONCURRENCY запросов на весь сервер:
+слоты — файлы в PASSWORD_HASH_SLOTS_DIR, занятые через flock, общие для всех
+воркеров gunicorn. Значение меньше числа воркеров оставляет воркеры свободными
+для просмотра страниц при всплеске входов. Запрос, не получивший слот за
+PASSWORD_HASH_WAIT секунд, получает HashingBusy (маршрут отвечает 503), а не
+ждет в очереди. Хеш считается прямо в потоке запроса, пока слот занят:
+синхронный воркер все равно ждет его результата, отдельный пул ничего не дает.
+
+При успешном входе хеш, созданный со старыми параметрами, пересчитывается
+с текущими (needs_rehash) в том же слоте, что и проверка пароля.
+"""
+import os
+import threading
+import time
+from functools import lru_cache
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from app.metrics import observe_password_hash, observe_password_rejected
+
+try:
+    import fcntl
+except ImportError:  # Windows: слоты ограничивают только текущий процесс
+    fcntl = None
+
+passwords_cli = AppGroup('passwords', help='Хеширование паролей.')
+
+# Варианты для `flask passwords benchmark`
+BENCHMARK_METHODS = (
+    'scrypt:16384:8:1',
+    'scrypt:32768:8:1',
+    'scrypt:65536:8:1',
+    'pbkdf2:sha256:300000',
+    'pbkdf2:sha256:600000',
+)
+SLOT_POLL_SECONDS = 0.01
+
+_local_slots = None
+_local_lock = threading.Lock()
+
+
+class HashingBusy(Exception):
+    """Все слоты хеширования заняты дольше PASSWORD_HASH_WAIT секунд"""
+
+
+def _try_file_slot(folder, concurrency):
+    """Занимает свободный слот; возвращает открытый файл (слот занят, пока он открыт) или None"""
+    for slot in range(concurrency):
+        f = open(os.path.join(folder, f'slot-{slot}'), 'a')
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            f.close()
+            continue
+        return f
+    return None
+
+
+def _try_local_slot(concurrency):
+    global _local_slots
+    with _local_lock:
+        if _local_slots is None:
+            _local_slots = threading.BoundedSemaphore(concurrency)
+    return _local_slots if _local_slots.acquire(blocking=False) else None
+
+
+def _acquire_slot(config):
+    concurrency = config['PASSWORD_HASH_CONCURRENCY']
+    folder = config['PASSWORD_HASH_SLOTS_DIR']
+    if fcntl is not None:
+        os.makedirs(folder, exist_ok=True)
+    deadline = time.monotonic() + config['PASSWORD_HASH_WAIT']
+    while True:
+        slot = _try_file_slot(folder, concurrency) if fcntl is not None else _try_local_slot(concurrency)
+        if slot is not None:
+            return slot
+        if time.monotonic() >= deadline:
+            observe_password_rejected()
+            raise HashingBusy()
+        time.sleep(SLOT_POLL_SECONDS)
+
+
+def _release_slot(slot):
+    if fcntl is not None:
+        slot.close()  # Закрытие файла снимает flock
+    else:
+        slot.release()
+
+
+def _run_limited(operation, func, *args):
+    slot = _acquire_slot(current_app.config)
+    try:
+        started = time.perf_counter()
+        result = func(*args)
+        observe_password_hash(operation, time.perf_counter() - started)
+        return result
+    finally:
+        _release_slot(slot)
+
+
+def hash_password(password):
+    """Хеш пароля с текущими параметрами; HashingBusy, если сервер перегружен"""
+    return _run_limited('hash', generate_password_hash, password, current_app.config['PASSWORD_HASH_METHOD'])
+
+
+def check_password(pwhash, password):
+    """Проверка пароля; HashingBusy, если сервер перегружен"""
+    return _run_limited('check', check_password_hash, pwhash, password)
+
+
+@lru_cache(maxsize=None)
+def _method_prefix(method):
+    """Метод в том виде, в котором werkzeug записывает его в хеш (scrypt -> scrypt:32768:8:1)"""
+    return generate_password_hash('', method, salt_length=1).split('$', 1)[0]
+
+
+def needs_rehash(pwhash):
+    """Создан ли хеш с параметрами, отличными от PASSWORD_HASH_METHOD"""
+    return pwhash.split('$', 1)[0] != _method_prefix(current_app.config['PASSWORD_HASH_METHOD'])
+
+
+def _check_and_rehash(pwhash, password, method):
+    if not check_password_hash(pwhash, password):
+        return False, None
+    return True, generate_password_hash(password, method)
+
+
+def verify_and_upgrade(user, password):
+    """Проверяет пароль пользователя и при успехе пересчитывает устаревший хеш.
+
+    Проверка и пересчет идут в одном слоте: верный пароль не получает 503 из-за
+    повторного ожидания слота. Новый хеш только присваивается user.password;
+    коммит делает вызывающий код.
+    """
+    if not needs_rehash(user.password):
+        return check_password(user.password, password)
+    valid, new_hash = _run_limited('check', _check_and_rehash, user.password, password,
+                                   current_app.config['PASSWORD_HASH_METHOD'])
+    if valid:
+        user.password = new_hash
+    return valid
+
+
+def init_passwords(app):
+    app.cli.add_command(passwords_cli)
+
+
+@passwords_cli.command('benchmark')
+@click.option('--rounds', default=5, show_default=True, help='Хешей на каждый вариант')
+@click.argument('methods', nargs=-1)
+def benchmark_command(rounds, methods):
+    """Время одного хеша для вариантов PASSWORD_HASH_METHOD на этом сервере"""
+    current = current_app.config['PASSWORD_HASH_METHOD']
+    methods = methods or tuple(dict.fromkeys((*BENCHMARK_METHODS, _method_prefix(current))))
+    concurrency = current_app.config['PASSWORD_HASH_CONCURRENCY']
+    for method in methods:
+        generate_password_hash('warm-up', method)
+        started = time.perf_counter()
+        for _ in range(rounds):
+            generate_password_hash('benchmark-password', method)
+        seconds = (time.perf_counter() - started) / rounds
+        marker = ' (текущий)' if _method_prefix(method) == _method_prefix(current) else ''
+        click.echo(f'{method:<24} {seconds * 1000:8.1f} мс, '
+                   f'до {concurrency / seconds:6.0f} входов/с при {concurrency} слотах{marker}')
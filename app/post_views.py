@@ -0,0 +1,210 @@
+# app/post_views.py
+"""Счетчик просмотров постов.
+
+Запрос к посту не пишет в БД: просмотр увеличивает счетчик в памяти воркера
+(post_id -> число). Фоновый поток записывает накопленное одним executemany
+UPDATE post SET views = views + :delta раз в VIEWS_FLUSH_INTERVAL секунд или
+сразу, как только накопится VIEWS_FLUSH_THRESHOLD просмотров; остаток
+записывается при остановке воркера (gunicorn worker_exit). Строки обновляются
+в порядке id, поэтому записи разных воркеров не взаимоблокируются.
+
+При аварийном завершении воркера теряется не больше просмотров, чем накоплено
+с последней записи: за VIEWS_FLUSH_INTERVAL секунд и не больше порога.
+Роботы, предзагрузка страниц и запросы без User-Agent не считаются.
+
+`flask views benchmark` сравнивает затраты на просмотр с прямым UPDATE и коммитом.
+
+В рейтинг «популярное сейчас» (app/trending.py) просмотры не входят: рейтинг —
+затухающая сумма событий с датами, которую `flask trending refresh` собирает
+заново из строк лайков и комментариев, а у просмотров есть только итоговый
+счетчик. Для этого понадобился бы журнал просмотров — та самая запись на каждый
+просмотр, которой этот модуль избегает.
+"""
+import atexit
+import os
+import re
+import threading
+import time
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import bindparam, delete, select, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from app import db
+from app.models import Blog, Post
+
+views_cli = AppGroup('views', help='Счетчики просмотров постов.')
+
+BOT_RE = re.compile(
+    r'bot|crawl|spider|slurp|archiver|facebookexternalhit|preview|headless|lighthouse|'
+    r'curl|wget|python-|httpclient|okhttp|java/|go-http|libwww|scrapy',
+    re.IGNORECASE,
+)
+
+_lock = threading.Lock()
+_pending = {}
+_pending_total = 0
+_wake = threading.Event()
+# PID процесса, в котором запущен поток записи (после fork его нужно запустить заново)
+_flusher_pid = None
+
+
+def is_countable(request):
+    """Считается ли запрос просмотром: GET от браузера, не робота и не предзагрузка"""
+    if request.method != 'GET':
+        return False
+    if request.headers.get('Sec-Purpose', request.headers.get('Purpose', '')).startswith('prefetch'):
+        return False
+    user_agent = request.user_agent.string
+    return bool(user_agent) and BOT_RE.search(user_agent) is None
+
+
+def record_view(post_id):
+    """Учитывает просмотр в памяти воркера"""
+    global _pending_total
+    with _lock:
+        _pending[post_id] = _pending.get(post_id, 0) + 1
+        _pending_total += 1
+        threshold_reached = _pending_total >= current_app.config['VIEWS_FLUSH_THRESHOLD']
+    if _flusher_pid != os.getpid():
+        _start_flusher()
+    if threshold_reached:
+        _wake.set()
+
+
+def view_count(post):
+    """Просмотры поста с учетом еще не записанных в этом воркере"""
+    return (post.views or 0) + _pending.get(post.id, 0)
+
+
+def _take_pending():
+    global _pending, _pending_total
+    with _lock:
+        pending, _pending, _pending_total = _pending, {}, 0
+    return pending
+
+
+def _restore_pending(pending):
+    global _pending_total
+    with _lock:
+        for post_id, delta in pending.items():
+            _pending[post_id] = _pending.get(post_id, 0) + delta
+            _pending_total += delta
+
+
+def flush_views():
+    """Записывает накопленные просмотры в БД; возвращает их число"""
+    pending = _take_pending()
+    if not pending:
+        return 0
+    post_table = Post.__table__
+    statement = (
+        update(post_table)
+        .where(post_table.c.id == bindparam('post_id'))
+        .values(views=post_table.c.views + bindparam('delta'))
+    )
+    try:
+        db.session.execute(statement, [
+            {'post_id': post_id, 'delta': delta} for post_id, delta in sorted(pending.items())
+        ])
+        db.session.commit()
+    except SQLAlchemyError:
+        db.session.rollback()
+        # Просмотры вернутся в буфер и уйдут со следующей записью
+        _restore_pending(pending)
+        raise
+    return sum(pending.values())
+
+
+def _flush_in_app(app):
+    with app.app_context():
+        try:
+            flush_views()
+        except SQLAlchemyError:
+            app.logger.exception('Не удалось записать просмотры постов')
+
+
+def _run_flusher(app):
+    interval = app.config['VIEWS_FLUSH_INTERVAL']
+    while True:
+        _wake.wait(interval)
+        _wake.clear()
+        _flush_in_app(app)
+
+
+def _start_flusher():
+    global _flusher_pid
+    with _lock:
+        if _flusher_pid == os.getpid():
+            return
+        _flusher_pid = os.getpid()
+    app = current_app._get_current_object()
+    threading.Thread(target=_run_flusher, args=(app,), name='post-views-flusher', daemon=True).start()
+    # Запасной вариант для запуска без gunicorn (python run.py)
+    atexit.register(_flush_in_app, app)
+
+
+def flush_on_exit(app):
+    """Записывает остаток при остановке воркера (вызывается из gunicorn worker_exit)"""
+    _flush_in_app(app)
+
+
+def init_post_views(app):
+    app.cli.add_command(views_cli)
+
+
+@views_cli.command('flush')
+def flush_command():
+    """Записывает просмотры, накопленные в этом процессе"""
+    count = flush_views()
+    click.echo(f'Записано просмотров: {count}')
+
+
+@views_cli.command('benchmark')
+@click.option('--views', 'total', default=2000, show_default=True, help='Сколько просмотров учесть')
+def benchmark_command(total):
+    """Время учета просмотра: буфер в памяти против UPDATE + COMMIT на каждый просмотр.
+
+    Замер идет на временном посте в первом блоге; пост удаляется в конце.
+    """
+    global _pending_total
+    blog_id = db.session.scalar(select(Blog.id).order_by(Blog.id).limit(1))
+    if blog_id is None:
+        raise click.ClickException('Нет ни одного блога')
+    scratch = Post(blog_id=blog_id, title='views benchmark', content='')
+    db.session.add(scratch)
+    db.session.commit()
+    post_id = scratch.id
+
+    post_table = Post.__table__
+    increment = update(post_table).where(post_table.c.id == post_id).values(views=post_table.c.views + 1)
+    # Порог не должен сработать во время замера: запись идет отдельным шагом
+    threshold = current_app.config['VIEWS_FLUSH_THRESHOLD']
+    current_app.config['VIEWS_FLUSH_THRESHOLD'] = total + 1
+    try:
+        started = time.perf_counter()
+        for _ in range(total):
+            db.session.execute(increment)
+            db.session.commit()
+        direct = (time.perf_counter() - started) / total
+
+        started = time.perf_counter()
+        for _ in range(total):
+            record_view(post_id)
+        buffered = (time.perf_counter() - started) / total
+        started = time.perf_counter()
+        flush_views()
+        flush = time.perf_counter() - started
+    finally:
+        current_app.config['VIEWS_FLUSH_THRESHOLD'] = threshold
+        with _lock:
+            _pending_total -= _pending.pop(post_id, 0)
+        db.session.rollback()
+        db.session.execute(delete(post_table).where(post_table.c.id == post_id))
+        db.session.commit()
+
+    click.echo(f'UPDATE + COMMIT на просмотр: {direct * 1e6:.1f} мкс')
+    click.echo(f'Буфер в памяти:              {buffered * 1e6:.1f} мкс')
+    click.echo(f'Запись буфера одним UPDATE:  {flush * 1e3:.2f} мс на {total} просмотров')
@@ -0,0 +1,307 @@
+# app/query_plans.py
+"""Проверка планов запросов горячих маршрутов.
+
+`flask indexes check` создает временную базу рядом с настроенной (на PostgreSQL —
+отдельную базу <имя>_indexes_check, на SQLite — временный файл), применяет к ней
+миграции, заполняет несколькими строками и вызывает маршруты из HOT_ROUTES через
+test_client. Все SQL-запросы, которые при этом выполнились, перехватываются
+(before_cursor_execute), и для каждого выполняется EXPLAIN с теми же параметрами.
+Команда завершается с ошибкой, если какой-то запрос читает таблицу целиком
+или какой-то маршрут упал либо ответил 4xx: его запросы проверены не все.
+Так проверяются запросы, которые маршруты действительно выполняют, включая
+ленивые загрузки из шаблонов, а не их копии. Новый горячий маршрут достаточно
+добавить в HOT_ROUTES (и при необходимости строки в _seed).
+
+На PostgreSQL последовательное сканирование запрещается на время EXPLAIN
+(enable_seqscan = off): на маленькой тестовой базе планировщик иначе выбрал бы его
+даже при наличии индекса, а проверяется именно наличие подходящего индекса.
+Проверка на PostgreSQL строже, чем на SQLite: EXPLAIN QUERY PLAN не показывает,
+что индекс обходится целиком, если SQLite выбрал его вместо отсутствующего.
+"""
+import os
+import re
+import shutil
+import sys
+import tempfile
+from contextlib import contextmanager
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from flask_migrate import upgrade
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from werkzeug.security import generate_password_hash
+
+from app import create_app, db
+from config import Config
+from app.models import (Attachment, Blog, Comment, Like, Notification, Post, PostScore, RelatedPost,
+                        Subscription, Tag, User)
+
+indexes_cli = AppGroup('indexes', help='Проверка индексов горячих запросов.')
+
+# Маршруты, запросы которых обязаны идти по индексу: (пользователь, метод, путь, данные формы).
+# В пути подставляются идентификаторы строк, созданных _seed
+HOT_ROUTES = (
+    ('reader', 'GET', '/', None),
+    ('reader', 'GET', '/blog/{blog}', None),
+    ('reader', 'GET', '/post/{post}', None),
+    ('reader', 'POST', '/post/{post}', {'content': 'Комментарий'}),
+    ('reader', 'POST', '/post/{post}/like', None),
+    ('reader', 'GET', '/notifications', None),
+    ('reader', 'GET', '/notifications/{notification}', None),
+    ('reader', 'GET', '/profile', None),
+    ('owner', 'GET', '/post/{post}/edit', None),
+    ('owner', 'POST', '/post/{post}/edit', {'title': 'Пост', 'content': 'Текст', 'tags': 'python, flask'}),
+    (None, 'GET', '/uploads/{filename}', None),
+)
+
+# Запросы, план которых проверяется (INSERT всегда пишет в таблицу и индексы не выбирает)
+CHECKED_STATEMENTS = ('SELECT', 'WITH', 'UPDATE', 'DELETE')
+
+SCRATCH_DATABASE_SUFFIX = '_indexes_check'
+
+INDEX_SCAN_RE = re.compile(r'(?:Index (?:Only )?Scan(?: Backward)? using|Bitmap Index Scan on) (\S+)')
+
+
+def _explain(conn, statement, parameters):
+    """Возвращает строки плана запроса"""
+    if conn.dialect.name == 'sqlite':
+        return [row[-1].strip() for row in conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)]
+    return [row[0] for row in conn.exec_driver_sql(f'EXPLAIN {statement}', parameters)]
+
+
+def _sqlite_full_scan(plan):
+    # SCAN подзапроса (MATERIALIZE/CO-ROUTINE anon_1) читает уже отобранные строки, а не таблицу
+    subqueries = {line.split(' ', 1)[1] for line in plan if line.startswith(('MATERIALIZE ', 'CO-ROUTINE '))}
+    return any(
+        line.startswith('SCAN ') and ' USING ' not in line
+        and line[5:] not in subqueries and line != 'SCAN CONSTANT ROW'
+        for line in plan
+    )
+
+
+def _plan_nodes(plan):
+    """Узлы плана PostgreSQL: [(узел, [его свойства: Index Cond, Filter, ...])]"""
+    nodes = []
+    for line in plan:
+        line = line.strip()
+        if not nodes or line.startswith('->'):
+            nodes.append((line.removeprefix('->').strip(), []))
+        else:
+            nodes[-1][1].append(line)
+    return nodes
+
+
+def _leading_column(conn, index_name):
+    return conn.execute(text(
+        'SELECT a.attname FROM pg_index i '
+        'JOIN pg_class c ON c.oid = i.indexrelid '
+        'JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0] '
+        'WHERE c.relname = :name'
+    ), {'name': index_name}).scalar()
+
+
+def _postgresql_full_scan(conn, plan):
+    """Seq Scan или обход всего индекса.
+
+    При enable_seqscan = off планировщик без подходящего индекса обходит целиком
+    любой индекс таблицы: без Index Cond (с Filter) или с условием не на первую
+    колонку индекса.
+    """
+    for node, details in _plan_nodes(plan):
+        if 'Seq Scan' in node:
+            return True
+        match = INDEX_SCAN_RE.search(node)
+        if match is None:
+            continue
+        condition = next((line for line in details if line.startswith('Index Cond:')), None)
+        if condition is None:
+            # Без фильтра это чтение по порядку индекса (ORDER BY ... LIMIT), а не поиск
+            if any(line.startswith('Filter:') for line in details):
+                return True
+            continue
+        column = _leading_column(conn, match.group(1).strip('"'))
+        if column is not None and not re.search(rf'\b{re.escape(column)}\b', condition):
+            return True
+    return False
+
+
+def _has_full_scan(conn, plan):
+    if conn.dialect.name == 'sqlite':
+        return _sqlite_full_scan(plan)
+    return _postgresql_full_scan(conn, plan)
+
+
+@contextmanager
+def _scratch_database(url):
+    """URL временной базы того же типа, что и url; база удаляется после проверки"""
+    url = make_url(url)
+    if url.get_backend_name() == 'sqlite':
+        folder = tempfile.mkdtemp(prefix='indexes-check-')
+        try:
+            yield url.set(database=os.path.join(folder, 'check.db'))
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+        return
+
+    name = f'{url.database}{SCRATCH_DATABASE_SUFFIX}'
+    admin = db.engine.execution_options(isolation_level='AUTOCOMMIT')
+    with admin.connect() as conn:
+        conn.exec_driver_sql(f'DROP DATABASE IF EXISTS "{name}"')
+        # Данные проверки на русском: кодировка не зависит от шаблона template1 кластера
+        conn.exec_driver_sql(f'CREATE DATABASE "{name}" ENCODING \'UTF8\' TEMPLATE template0')
+    try:
+        yield url.set(database=name)
+    finally:
+        with admin.connect() as conn:
+            conn.exec_driver_sql(f'DROP DATABASE IF EXISTS "{name}"')
+
+
+def _check_config(url, upload_folder):
+    """Конфигурация приложения для проверки: временная база, без CSRF и счетчика просмотров"""
+    return type('IndexesCheckConfig', (Config,), {
+        'SQLALCHEMY_DATABASE_URI': url.render_as_string(hide_password=False),
+        'UPLOAD_FOLDER': upload_folder,
+        'WTF_CSRF_ENABLED': False,
+        'VIEWS_ENABLED': False,
+        # Ошибка маршрута выходит из test_client как есть, а не страницей 500
+        'PROPAGATE_EXCEPTIONS': True,
+    })
+
+
+def _seed(upload_folder):
+    """Создает по несколько строк в каждой таблице; возвращает идентификаторы для HOT_ROUTES"""
+    password = generate_password_hash('indexes-check')
+    owner = User(username='owner', email='owner@example.com', password=password)
+    reader = User(username='reader', email='reader@example.com', password=password)
+    blog = Blog(title='Блог', description='Описание', owner=owner)
+    tags = [Tag(name='python'), Tag(name='flask')]
+    posts = [Post(blog=blog, title=f'Пост {i}', content='Текст', tags=tags[:i % 2 + 1]) for i in range(3)]
+    db.session.add_all([owner, reader, blog, *tags, *posts])
+    db.session.flush()
+
+    filename = 'indexes-check.txt'
+    with open(os.path.join(upload_folder, filename), 'w') as f:
+        f.write('indexes check')
+    db.session.add_all([
+        Subscription(subscriber=reader, blog=blog),
+        Comment(post=posts[0], author=owner, content='Комментарий'),
+        Like(post=posts[1], user=reader),
+        Attachment(post=posts[0], uploader=owner, filename=filename, original_filename=filename,
+                   mimetype='text/plain', file_type='document'),
+        PostScore(post=posts[0], score=1.0),
+        RelatedPost(post_id=posts[0].id, related_post_id=posts[1].id, score=0.5),
+    ])
+    notification = Notification(user=reader, post=posts[0])
+    db.session.add(notification)
+    db.session.commit()
+    return {
+        'users': {'owner': owner.id, 'reader': reader.id},
+        'blog': blog.id,
+        'post': posts[0].id,
+        'notification': notification.id,
+        'filename': filename,
+    }
+
+
+def _capture_route_statements(app, engine, ids):
+    """Вызывает HOT_ROUTES; возвращает {текст запроса: (маршрут, параметры)} и ошибки маршрутов.
+
+    Каждый запрос, как и на сервере, идет в своем контексте приложения: с новой
+    сессией БД и новым current_user, поэтому ленивые загрузки не прячутся за уже
+    загруженными объектами.
+    """
+    captured = {}
+    errors = {}
+    route = None
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if executemany or not statement.lstrip().upper().startswith(CHECKED_STATEMENTS):
+            return
+        captured.setdefault(statement, (route, parameters))
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        for user, method, path, data in HOT_ROUTES:
+            route = f'{method} {path}'
+            client = app.test_client()
+            if user is not None:
+                with client.session_transaction() as session:
+                    session['_user_id'] = str(ids['users'][user])
+                    session['_fresh'] = True
+            try:
+                response = client.open(path.format(**ids), method=method, data=data)
+            except Exception as e:  # запросы до ошибки все равно проверяются
+                errors[route] = f'{type(e).__name__}: {e}'
+                continue
+            # 4xx — маршрут не дошел до своих запросов (нет прав, не найдено)
+            if response.status_code >= 400:
+                errors[route] = f'HTTP {response.status_code}'
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    return captured, errors
+
+
+def _find_full_scans(engine, captured):
+    """Возвращает {'маршрут: запрос': план} для запросов, читающих таблицу целиком"""
+    failures = {}
+    with engine.connect() as conn:
+        with conn.begin():
+            if conn.dialect.name == 'postgresql':
+                conn.execute(text('SET LOCAL enable_seqscan = off'))
+            for statement, (route, parameters) in captured.items():
+                plan = _explain(conn, statement, parameters)
+                if _has_full_scan(conn, plan):
+                    failures[f'{route}: {statement}'] = plan
+    return failures
+
+
+def check_query_plans():
+    """Проверяет запросы HOT_ROUTES на временной базе.
+
+    Возвращает ({'маршрут: запрос': план} для запросов, читающих таблицу
+    целиком, {маршрут: ошибка}, число проверенных запросов).
+    """
+    upload_folder = tempfile.mkdtemp(prefix='indexes-check-uploads-')
+    try:
+        with _scratch_database(current_app.config['SQLALCHEMY_DATABASE_URI']) as url:
+            app = create_app(_check_config(url, upload_folder))
+            with app.app_context():
+                engine = db.engine
+            try:
+                with app.app_context():
+                    try:
+                        upgrade()
+                        ids = _seed(upload_folder)
+                    finally:
+                        db.session.remove()
+                captured, errors = _capture_route_statements(app, engine, ids)
+                failures = _find_full_scans(engine, captured)
+            finally:
+                # Временную базу нельзя удалить, пока к ней открыты соединения
+                engine.dispose()
+    finally:
+        shutil.rmtree(upload_folder, ignore_errors=True)
+    return failures, errors, len(captured)
+
+
+def init_query_plans(app):
+    app.cli.add_command(indexes_cli)
+
+
+@indexes_cli.command('check')
+def check_command():
+    """Проверяет, что запросы горячих маршрутов используют индексы"""
+    failures, errors, checked = check_query_plans()
+    # Упавший маршрут не выполнил часть запросов (в том числе ленивые загрузки шаблона),
+    # поэтому проверка не пройдена, даже если выполненные запросы идут по индексам
+    for route, error in errors.items():
+        click.echo(f'Маршрут завершился ошибкой: {route}: {error}')
+    for name, plan in failures.items():
+        click.echo(f'Чтение таблицы целиком: {name}')
+        for line in plan:
+            click.echo(f'    {line}')
+    if failures or errors:
+        sys.exit(1)
+    click.echo(f'Все {checked} запросов с {len(HOT_ROUTES)} маршрутов используют индексы.')
@@ -0,0 +1,163 @@
+# app/related.py
+"""Похожие посты по тегам.
+
+Для каждого поста хранятся RELATED_TOP_K соседей с наибольшим сходством Жаккара
+|A ∩ B| / |A ∪ B| по множествам тегов. Индекс целиком перестраивается командой
+`flask related rebuild`, а при создании и редактировании поста обновляется
+только его окрестность.
+"""
+import heapq
+import time
+from collections import defaultdict
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import func
+
+from app import db
+from app.models import Post, RelatedPost, post_tags
+
+related_cli = AppGroup('related', help='Индекс похожих постов.')
+
+
+def _top_k(post_id, tag_count, intersections, sizes, k):
+    """Выбирает k самых похожих постов: [(score, related_post_id), ...]"""
+    scored = (
+        (common / (tag_count + sizes[other] - common), other)
+        for other, common in intersections.items()
+        if other != post_id
+    )
+    return heapq.nlargest(k, scored)
+
+
+def related_posts(post, limit=None):
+    """Похожие посты: один запрос по индексу (post_id, score), вместе с блогами для шаблона"""
+    limit = limit or current_app.config['RELATED_TOP_K']
+    return (Post.query
+            .options(db.joinedload(Post.blog))
+            .join(RelatedPost, RelatedPost.related_post_id == Post.id)
+            .filter(RelatedPost.post_id == post.id)
+            .order_by(RelatedPost.score.desc(), Post.id.desc())
+            .limit(limit)
+            .all())
+
+
+def update_related(post):
+    """Пересчитывает похожие посты после изменения тегов поста.
+
+    Обновляется список самого поста и списки постов, у которых с ним есть общие теги.
+    Как и в rebuild_related, теги больше чем у RELATED_MAX_TAG_POSTS постов при
+    поиске пар пропускаются. Посты, ранее вытесненные из чужих списков, возвращаются
+    только при полной перестройке индекса. Коммит делает вызывающий код.
+    """
+    config = current_app.config
+    k = config['RELATED_TOP_K']
+    tag_ids = [tag.id for tag in post.tags]
+
+    pair_tag_ids = []
+    if tag_ids:
+        tag_sizes = (db.session.query(post_tags.c.tag_id, func.count())
+                     .filter(post_tags.c.tag_id.in_(tag_ids))
+                     .group_by(post_tags.c.tag_id))
+        pair_tag_ids = [tag_id for tag_id, count in tag_sizes if count <= config['RELATED_MAX_TAG_POSTS']]
+
+    intersections = {}
+    if pair_tag_ids:
+        intersections = dict(
+            db.session.query(post_tags.c.post_id, func.count())
+            .filter(post_tags.c.tag_id.in_(pair_tag_ids), post_tags.c.post_id != post.id)
+            .group_by(post_tags.c.post_id)
+            .all()
+        )
+    sizes = {}
+    if intersections:
+        sizes = dict(
+            db.session.query(post_tags.c.post_id, func.count())
+            .filter(post_tags.c.post_id.in_(list(intersections)))
+            .group_by(post_tags.c.post_id)
+            .all()
+        )
+
+    # Собственный список поста и его упоминания в чужих списках строятся заново
+    RelatedPost.query.filter(
+        (RelatedPost.post_id == post.id) | (RelatedPost.related_post_id == post.id)
+    ).delete(synchronize_session=False)
+    rows = [
+        {'post_id': post.id, 'related_post_id': other, 'score': score}
+        for score, other in _top_k(post.id, len(tag_ids), intersections, sizes, k)
+    ]
+
+    if intersections:
+        neighbours = defaultdict(list)
+        for row in RelatedPost.query.filter(RelatedPost.post_id.in_(list(intersections))):
+            neighbours[row.post_id].append(row)
+        for other, common in intersections.items():
+            score = common / (len(tag_ids) + sizes[other] - common)
+            current = neighbours[other]
+            if len(current) < k:
+                rows.append({'post_id': other, 'related_post_id': post.id, 'score': score})
+                continue
+            weakest = min(current, key=lambda row: row.score)
+            if score > weakest.score:
+                db.session.delete(weakest)
+                rows.append({'post_id': other, 'related_post_id': post.id, 'score': score})
+
+    if rows:
+        db.session.bulk_insert_mappings(RelatedPost, rows)
+
+
+def rebuild_related(batch_size=10000):
+    """Полностью перестраивает индекс похожих постов.
+
+    Сходство считается разреженно через инвертированный индекс «тег -> посты»:
+    перебираются только пары постов с общими тегами. Теги, которые стоят более
+    чем у RELATED_MAX_TAG_POSTS постов, почти ничего не говорят о сходстве и при
+    переборе пар пропускаются (но учитываются в размерах множеств).
+    """
+    config = current_app.config
+    k = config['RELATED_TOP_K']
+    max_tag_posts = config['RELATED_MAX_TAG_POSTS']
+
+    post_tag_ids = defaultdict(list)
+    tag_post_ids = defaultdict(list)
+    rows = (db.session.query(post_tags.c.post_id, post_tags.c.tag_id)
+            .execution_options(yield_per=batch_size))
+    for post_id, tag_id in rows:
+        post_tag_ids[post_id].append(tag_id)
+        tag_post_ids[tag_id].append(post_id)
+
+    RelatedPost.query.delete(synchronize_session=False)
+
+    batch = []
+    for post_id, tag_ids in post_tag_ids.items():
+        intersections = defaultdict(int)
+        for tag_id in tag_ids:
+            posts_with_tag = tag_post_ids[tag_id]
+            if len(posts_with_tag) > max_tag_posts:
+                continue
+            for other in posts_with_tag:
+                intersections[other] += 1
+        sizes = {other: len(post_tag_ids[other]) for other in intersections}
+        for score, other in _top_k(post_id, len(tag_ids), intersections, sizes, k):
+            batch.append({'post_id': post_id, 'related_post_id': other, 'score': score})
+        if len(batch) >= batch_size:
+            db.session.bulk_insert_mappings(RelatedPost, batch)
+            batch = []
+    if batch:
+        db.session.bulk_insert_mappings(RelatedPost, batch)
+    db.session.commit()
+    return len(post_tag_ids)
+
+
+def init_related(app):
+    app.cli.add_command(related_cli)
+
+
+@related_cli.command('rebuild')
+@click.option('--batch-size', default=10000, show_default=True, help='Размер пакета при чтении и записи.')
+def rebuild_command(batch_size):
+    """Перестраивает индекс похожих постов с нуля"""
+    started = time.perf_counter()
+    count = rebuild_related(batch_size)
+    click.echo(f'Похожие посты пересчитаны для {count} постов за {time.perf_counter() - started:.2f} с')
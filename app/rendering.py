@@ -0,0 +1,118 @@
+# app/rendering.py
+"""Рендеринг страниц целиком или потоком (STREAM_TEMPLATES).
+
+`flask pages benchmark` сравнивает время до первого байта, полное время и
+размер ответа с потоком и без, без сжатия и со сжатием gzip/brotli.
+"""
+import time
+
+import click
+from flask import current_app, get_flashed_messages, render_template, stream_template
+from flask.cli import AppGroup
+from sqlalchemy import func, select
+
+from app import db
+from app.models import Blog, Comment, Post
+
+rendering_cli = AppGroup('pages', help='Потоковый рендеринг и сжатие страниц.')
+
+
+def _buffered(chunks, size):
+    """Склеивает мелкие фрагменты шаблона в блоки не меньше size символов"""
+    buffer = []
+    buffered = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= size:
+            yield ''.join(buffer)
+            buffer = []
+            buffered = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def render_page(template_name, **context):
+    """Рендерит страницу; при STREAM_TEMPLATES отдает ее потоком.
+
+    В потоковом режиме <head> и верх страницы уходят клиенту до того,
+    как отрендерен весь шаблон.
+    """
+    app = current_app._get_current_object()
+    if not app.config['STREAM_TEMPLATES']:
+        return render_template(template_name, **context)
+
+    # Сообщения забираются из сессии заранее: cookie сессии уходит вместе с заголовками,
+    # до того как шаблон вызовет get_flashed_messages()
+    get_flashed_messages()
+
+    # stream_template сохраняет контекст запроса на время генерации и отправляет
+    # сигналы before_render_template/template_rendered (метрики рендеринга)
+    chunks = _buffered(stream_template(template_name, **context), app.config['STREAM_CHUNK_SIZE'])
+    return app.response_class(chunks, mimetype='text/html')
+
+
+def _measure(client, path, encoding):
+    """(время до первого блока ответа, полное время, байт передано) для одного запроса"""
+    started = time.perf_counter()
+    response = client.get(path, headers={'Accept-Encoding': encoding}, buffered=False)
+    first_byte = None
+    size = 0
+    for chunk in response.response:
+        if chunk and first_byte is None:
+            first_byte = time.perf_counter() - started
+        size += len(chunk)
+    response.close()
+    return first_byte or 0.0, time.perf_counter() - started, size
+
+
+def init_rendering(app):
+    app.cli.add_command(rendering_cli)
+
+
+@rendering_cli.command('benchmark')
+@click.option('--path', 'paths', multiple=True,
+              help='Страница для замера (можно несколько); по умолчанию самый комментируемый пост и самый большой блог')
+@click.option('--runs', default=20, show_default=True, help='Запросов на каждый вариант')
+def benchmark_command(paths, runs):
+    """TTFB, полное время и размер ответа: обычный рендеринг и поток, без сжатия, gzip и brotli"""
+    app = current_app._get_current_object()
+    if not paths:
+        post_id = db.session.scalar(
+            select(Comment.post_id).group_by(Comment.post_id).order_by(func.count().desc()).limit(1)
+        ) or db.session.scalar(select(Post.id).order_by(Post.id).limit(1))
+        blog_id = db.session.scalar(
+            select(Post.blog_id).group_by(Post.blog_id).order_by(func.count().desc()).limit(1)
+        ) or db.session.scalar(select(Blog.id).order_by(Blog.id).limit(1))
+        paths = [path for path in (post_id and f'/post/{post_id}', blog_id and f'/blog/{blog_id}') if path]
+    if not paths:
+        raise click.ClickException('Нет ни одного поста или блога')
+
+    encodings = ['identity', 'gzip'] + (['br'] if app.config['COMPRESS_ENABLED'] and _has_brotli() else [])
+    saved = app.config['STREAM_TEMPLATES'], app.config['COMPRESS_ENABLED']
+    client = app.test_client()
+    try:
+        for path in paths:
+            click.echo(path)
+            for stream in (False, True):
+                for encoding in encodings:
+                    app.config['STREAM_TEMPLATES'] = stream
+                    app.config['COMPRESS_ENABLED'] = encoding != 'identity'
+                    try:
+                        _measure(client, path, encoding)  # Прогрев
+                    except Exception as e:
+                        click.echo(f'  страница не отрисовывается: {e!r}')
+                        break
+                    results = [_measure(client, path, encoding) for _ in range(runs)]
+                    ttfb = sorted(result[0] for result in results)[runs // 2]
+                    total = sorted(result[1] for result in results)[runs // 2]
+                    mode = 'поток' if stream else 'целиком'
+                    click.echo(f'  {mode:<8} {encoding:<9} TTFB {ttfb * 1e3:7.1f} мс   '
+                               f'полностью {total * 1e3:7.1f} мс   {results[-1][2] / 1024:8.1f} КБ')
+    finally:
+        app.config['STREAM_TEMPLATES'], app.config['COMPRESS_ENABLED'] = saved
+
+
+def _has_brotli():
+    from app.compression import brotli
+    return brotli is not None
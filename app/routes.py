@@ -1,13 +1,16 @@
 # routes.py
 import os
 import mimetypes
-from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app, abort
-from app.models import User, Blog, Post, Comment, db, Subscription, Like, Attachment 
+from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app, abort, jsonify, Response, send_file, send_from_directory, stream_with_context, make_response
+from app.models import User, Blog, Post, Comment, db, Subscription, Like, Attachment, UploadSession, Notification
 from flask_login import login_user, login_required, logout_user, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.rendering import render_page
+from app.metrics import observe_upload, observe_file_served
+from app import trending, related, uploads, notifications, partitioning, exports, sitemaps, post_views, passwords
 from app.forms import RegistrationForm, LoginForm, BlogForm, PostForm, CommentForm, UpdateProfileForm, ChangePasswordForm
 from werkzeug.utils import secure_filename
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from datetime import datetime
 
 bp = Blueprint('main', __name__)
@@ -45,26 +48,54 @@ def is_safe_mime_type(mimetype):
     mimetype = mimetype.split(';')[0].strip().lower()
     return mimetype in ALLOWED_MIME_TYPES
 
-def validate_file_upload(file):
-    """Проверяет файл на безопасность"""
-    if not file or not file.filename:
+def validate_upload_metadata(filename, mimetype, size):
+    """Проверяет имя, MIME-тип и размер файла; возвращает (успех, MIME-тип или ошибка)"""
+    if not filename:
         return False, "Файл не выбран"
     
     # Проверка расширения
-    if not allowed_file(file.filename):
+    if not allowed_file(filename):
         return False, "Недопустимый тип файла"
     
     # Проверка MIME-типа
-    mimetype = file.mimetype
     if not is_safe_mime_type(mimetype):
         # Дополнительная проверка через mimetypes модуль
-        guessed_type, _ = mimetypes.guess_type(file.filename)
+        guessed_type, _ = mimetypes.guess_type(filename)
         if not guessed_type or guessed_type not in ALLOWED_MIME_TYPES:
             return False, "Недопустимый MIME-тип файла"
         mimetype = guessed_type
     
+    # Ограничение размера зависит от типа файла
+    file_type = get_file_type(filename.rsplit('.', 1)[1].lower())
+    limit = uploads.max_upload_size(file_type)
+    if size > limit:
+        return False, f"Файл слишком большой (максимум {limit // (1024 * 1024)} МБ)"
+    
     return True, mimetype
 
+def validate_file_upload(file):
+    """Проверяет файл на безопасность"""
+    if not file or not file.filename:
+        return False, "Файл не выбран"
+    
+    file.stream.seek(0, os.SEEK_END)
+    size = file.stream.tell()
+    file.stream.seek(0)
+    return validate_upload_metadata(file.filename, file.mimetype, size)
+
+def unique_upload_filename(original_filename):
+    """Безопасное имя файла, не занятое в UPLOAD_FOLDER"""
+    filename = secure_filename(original_filename)
+    upload_path = current_app.config['UPLOAD_FOLDER']
+    
+    counter = 1
+    unique_filename = filename
+    while os.path.exists(os.path.join(upload_path, unique_filename)):
+        name, ext = os.path.splitext(filename)
+        unique_filename = f"{name}_{counter}{ext}"
+        counter += 1
+    return unique_filename
+
 def get_file_type(extension):
     image_ext = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp'}
     audio_ext = {'mp3', 'wav', 'ogg', 'flac', 'm4a'}
@@ -83,11 +114,21 @@ def get_file_type(extension):
 
 # ---------------- Регистрация и логин ----------------
 
+def password_busy(template, **context):
+    """Ответ 503, если все слоты хеширования паролей заняты"""
+    flash('Сервер перегружен. Повторите попытку через несколько секунд.', 'warning')
+    response = make_response(render_template(template, **context), 503)
+    response.headers['Retry-After'] = '5'
+    return response
+
 @bp.route('/register', methods=['GET', 'POST'])
 def register():
     form = RegistrationForm()
     if form.validate_on_submit():
-        hashed_password = generate_password_hash(form.password.data)
+        try:
+            hashed_password = passwords.hash_password(form.password.data)
+        except passwords.HashingBusy:
+            return password_busy('register.html', form=form)
         user = User(username=form.username.data, email=form.email.data, password=hashed_password)
         db.session.add(user)
         try:
@@ -105,7 +146,13 @@ def login():
     form = LoginForm()
     if form.validate_on_submit():
         user = User.query.filter_by(email=form.email.data).first()
-        if user and check_password_hash(user.password, form.password.data):
+        try:
+            valid = user is not None and passwords.verify_and_upgrade(user, form.password.data)
+        except passwords.HashingBusy:
+            return password_busy('login.html', form=form)
+        if valid:
+            # Хеш мог быть пересчитан с текущими параметрами
+            db.session.commit()
             login_user(user)
             next_page = request.args.get('next')
             flash('Вход выполнен успешно!', 'success')
@@ -131,12 +178,14 @@ def index():
     from app.models import User, Post
     users_count = User.query.count()
     posts_count = Post.query.count()
+    popular_posts = trending.top_posts()
     
     return render_template('index.html', 
                          title='Главная', 
                          blogs=blogs,
                          users_count=users_count,
-                         posts_count=posts_count)
+                         posts_count=posts_count,
+                         popular_posts=popular_posts)
 
 @bp.route('/new_blog', methods=['GET', 'POST'])
 @login_required
@@ -146,6 +195,7 @@ def new_blog():
         blog = Blog(title=form.title.data, description=form.description.data, owner=current_user)
         db.session.add(blog)
         db.session.commit()
+        sitemaps.schedule_update(blog_ids=[blog.id])
         flash('Ваш новый блог успешно создан!', 'success')
         return redirect(url_for('main.blog', blog_id=blog.id))
         
@@ -160,7 +210,7 @@ def blog(blog_id):
     if current_user.is_authenticated:
         is_subscribed = Subscription.query.filter_by(user_id=current_user.id, blog_id=blog.id).first() is not None
         
-    return render_template('blog.html', blog=blog, posts=posts, is_subscribed=is_subscribed)
+    return render_page('blog.html', blog=blog, posts=posts, is_subscribed=is_subscribed)
 
 @bp.route('/blog/<int:blog_id>/edit', methods=['GET', 'POST'])
 @login_required
@@ -195,8 +245,10 @@ def delete_blog(blog_id):
         flash('Вы не являетесь владельцем этого блога.', 'danger')
         return redirect(url_for('main.index'))
     
+    post_ids = [post.id for post in blog.posts]
     db.session.delete(blog)
     db.session.commit()
+    sitemaps.schedule_update(blog_ids=[blog_id], post_ids=post_ids)
     flash(f'Блог "{blog.title}" успешно удален.', 'success')
     return redirect(url_for('main.index'))
 
@@ -213,8 +265,13 @@ def subscribe_blog(blog_id):
     if not Subscription.query.filter_by(user_id=current_user.id, blog_id=blog.id).first():
         subscription = Subscription(user_id=current_user.id, blog_id=blog.id)
         db.session.add(subscription)
-        db.session.commit()
-        flash(f'Вы успешно подписались на блог "{blog.title}"!', 'success')
+        try:
+            db.session.commit()
+            flash(f'Вы успешно подписались на блог "{blog.title}"!', 'success')
+        except IntegrityError:
+            # Повторный запрос уже создал подписку (уникальный индекс user_id, blog_id)
+            db.session.rollback()
+            flash(f'Вы уже подписаны на блог "{blog.title}".', 'info')
     else:
         flash(f'Вы уже подписаны на блог "{blog.title}".', 'info')
         
@@ -235,6 +292,32 @@ def unsubscribe_blog(blog_id):
         
     return redirect(url_for('main.blog', blog_id=blog.id))
 
+# ---------------- Уведомления ----------------
+
+@bp.route('/notifications')
+@login_required
+def notifications_list():
+    before_id = request.args.get('before', type=int)
+    if before_id is None:
+        # Первая страница заодно исправляет кеш счетчика непрочитанных
+        notifications.sync_unread_count(current_user)
+    items, next_before = notifications.notifications_page(current_user, before_id)
+    return render_template('notifications.html', title='Уведомления', notifications=items, next_before=next_before)
+
+@bp.route('/notifications/<int:notification_id>')
+@login_required
+def open_notification(notification_id):
+    notification = Notification.query.filter_by(id=notification_id, user_id=current_user.id).first_or_404()
+    notifications.mark_read(current_user, notification)
+    return redirect(url_for('main.post', post_id=notification.post_id))
+
+@bp.route('/notifications/read-all', methods=['POST'])
+@login_required
+def read_all_notifications():
+    notifications.mark_all_read(current_user)
+    flash('Все уведомления отмечены как прочитанные.', 'info')
+    return redirect(url_for('main.notifications_list'))
+
 # ---------------- Функции постов ----------------
 
 @bp.route('/blog/<int:blog_id>/post/new', methods=['GET', 'POST'])
@@ -247,7 +330,7 @@ def new_post(blog_id):
         
     form = PostForm()
     if form.validate_on_submit():
-        post = Post(title=form.title.data, content=form.content.data, blog=blog)
+        post = Post(title=form.title.data, content=form.content.data, blog=blog, notify_pending=True)
         db.session.add(post)
         db.session.flush()  # Чтобы получить ID поста
         
@@ -264,56 +347,51 @@ def new_post(blog_id):
                     db.session.flush()
                 if tag not in post.tags:
                     post.tags.append(tag)
+        related.update_related(post)
         
-        # Обработка прикрепленного файла с улучшенной валидацией
-        if form.attachment.data:
-            file = form.attachment.data
+        # Обработка прикрепленных файлов с улучшенной валидацией
+        for file in form.attachment.data or []:
+            if not file or not file.filename:
+                continue
             is_valid, validation_result = validate_file_upload(file)
             
             if not is_valid:
-                flash(f'Ошибка загрузки файла: {validation_result}', 'danger')
-            else:
-                original_filename = file.filename
-                filename = secure_filename(original_filename)
-                
-                upload_path = current_app.config['UPLOAD_FOLDER']
-                os.makedirs(upload_path, exist_ok=True)
-                
-                file_path = os.path.join(upload_path, filename)
+                flash(f'Ошибка загрузки файла {file.filename}: {validation_result}', 'danger')
+                continue
+            
+            original_filename = file.filename
+            unique_filename = unique_upload_filename(original_filename)
+            file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], unique_filename)
+            
+            try:
+                file.save(file_path)
                 
-                counter = 1
-                unique_filename = filename
-                while os.path.exists(file_path):
-                    name, ext = os.path.splitext(filename)
-                    unique_filename = f"{name}_{counter}{ext}"
-                    file_path = os.path.join(upload_path, unique_filename)
-                    counter += 1
+                extension = unique_filename.rsplit('.', 1)[1].lower()
+                file_type = get_file_type(extension)
+                observe_upload(os.path.getsize(file_path), file_type)
                 
-                try:
-                    file.save(file_path)
-                    
-                    extension = unique_filename.rsplit('.', 1)[1].lower()
-                    file_type = get_file_type(extension)
-                    
-                    attachment = Attachment(
-                        post=post,
-                        user_id=current_user.id,
-                        filename=unique_filename,
-                        original_filename=original_filename,
-                        mimetype=validation_result,  # Используем проверенный MIME-тип
-                        file_type=file_type
-                    )
-                    db.session.add(attachment)
-                except Exception as e:
-                    flash(f'Ошибка при сохранении файла: {str(e)}', 'danger')
-                    # Удаляем файл, если он был частично сохранен
-                    if os.path.exists(file_path):
-                        try:
-                            os.remove(file_path)
-                        except:
-                            pass
+                attachment = Attachment(
+                    post=post,
+                    user_id=current_user.id,
+                    filename=unique_filename,
+                    original_filename=original_filename,
+                    mimetype=validation_result,  # Используем проверенный MIME-тип
+                    file_type=file_type
+                )
+                db.session.add(attachment)
+            except Exception as e:
+                flash(f'Ошибка при сохранении файла: {str(e)}', 'danger')
+                # Удаляем файл, если он был частично сохранен
+                if os.path.exists(file_path):
+                    try:
+                        os.remove(file_path)
+                    except:
+                        pass
 
         db.session.commit()
+        # Уведомления подписчикам рассылаются в фоне, пост публикуется сразу
+        notifications.notify_subscribers(post)
+        sitemaps.schedule_update(blog_ids=[blog.id], post_ids=[post.id])
         flash('Ваш пост успешно создан!', 'success')
         return redirect(url_for('main.post', post_id=post.id))
         
@@ -323,6 +401,8 @@ def new_post(blog_id):
 @bp.route('/post/<int:post_id>', methods=['GET', 'POST']) # <-- ИСПРАВЛЕННЫЙ МАРШРУТ
 def post(post_id):
     post = Post.query.get_or_404(post_id)
+    if current_app.config['VIEWS_ENABLED'] and post_views.is_countable(request):
+        post_views.record_view(post.id)
     comments = Comment.query.filter_by(post_id=post.id).order_by(Comment.created_at.desc()).all()
     
     # ИСПРАВЛЕНИЕ ОШИБКИ: Используем len() для подсчета элементов в Python-списке
@@ -340,6 +420,8 @@ def post(post_id):
             
         comment = Comment(content=form.content.data, post=post, author=current_user)
         db.session.add(comment)
+        db.session.flush()
+        trending.record_comment(comment)
         db.session.commit()
         flash('Ваш комментарий добавлен!', 'success')
         
@@ -351,16 +433,19 @@ def post(post_id):
     post_index = next((i for i, p in enumerate(all_posts) if p.id == post.id), None)
     prev_post = all_posts[post_index + 1] if post_index is not None and post_index + 1 < len(all_posts) else None
     next_post = all_posts[post_index - 1] if post_index is not None and post_index > 0 else None
+    related_posts = related.related_posts(post)
     
-    return render_template('post.html', 
-                           title=post.title, 
-                           post=post, 
-                           comments=comments, 
-                           form=form, 
-                           is_liked=is_liked,
-                           like_count=like_count,
-                           prev_post=prev_post,
-                           next_post=next_post)
+    return render_page('post.html', 
+                       title=post.title, 
+                       post=post, 
+                       comments=comments, 
+                       form=form, 
+                       is_liked=is_liked,
+                       like_count=like_count,
+                       view_count=post_views.view_count(post),
+                       prev_post=prev_post,
+                       next_post=next_post,
+                       related_posts=related_posts)
 
 # ---------------- Функции редактирования и удаления ----------------
 
@@ -392,8 +477,11 @@ def edit_post(post_id):
                     db.session.add(tag)
                     db.session.flush()
                 post.tags.append(tag)
+        related.update_related(post)
+        post.updated_at = datetime.utcnow()
         
         db.session.commit()
+        sitemaps.schedule_update(post_ids=[post.id])
         flash('Ваш пост был успешно обновлен!', 'success')
         return redirect(url_for('main.post', post_id=post.id))
         
@@ -421,6 +509,7 @@ def delete_post(post_id):
     
     db.session.delete(post)
     db.session.commit()
+    sitemaps.schedule_update(blog_ids=[blog_id], post_ids=[post_id])
     flash(f'Пост "{post.title}" успешно удален.', 'success')
     return redirect(url_for('main.blog', blog_id=blog_id))
 
@@ -430,17 +519,27 @@ def delete_post(post_id):
 @login_required
 def like_post(post_id):
     post = Post.query.get_or_404(post_id)
+    # В секционированной таблице like нет уникального индекса: параллельные запросы ждут друг друга
+    partitioning.lock_like(current_user.id, post.id)
     like = Like.query.filter_by(user_id=current_user.id, post_id=post.id).first()
     
     if like:
+        trending.record_like(like, removed=True)
         db.session.delete(like)
         db.session.commit()
         flash(f'Вы убрали лайк с поста "{post.title}".', 'info')
     else:
         new_like = Like(user_id=current_user.id, post_id=post.id)
         db.session.add(new_like)
-        db.session.commit()
-        flash(f'Вы лайкнули пост "{post.title}"!', 'success')
+        try:
+            db.session.flush()
+            trending.record_like(new_like)
+            db.session.commit()
+            flash(f'Вы лайкнули пост "{post.title}"!', 'success')
+        except IntegrityError:
+            # Повторный запрос уже поставил лайк (уникальный индекс user_id, post_id)
+            db.session.rollback()
+            flash(f'Вы уже лайкнули пост "{post.title}".', 'info')
         
     return redirect(url_for('main.post', post_id=post.id))
 
@@ -457,6 +556,7 @@ def delete_comment(comment_id):
     is_admin = getattr(current_user, 'role', 'reader') == 'admin' # Используем getattr на случай, если role не определена
     
     if is_owner or is_post_owner or is_admin:
+        trending.record_comment(comment, removed=True)
         db.session.delete(comment)
         db.session.commit()
         flash('Комментарий удален.', 'success')
@@ -467,6 +567,43 @@ def delete_comment(comment_id):
 
 # ---------------- Служебные маршруты ----------------
 
+@bp.route('/sitemap.xml')
+def sitemap_index():
+    """Индекс карты сайта; если он еще не собран, сборка запускается в фоне"""
+    if not os.path.exists(sitemaps.index_path()):
+        sitemaps.schedule_build()
+        return Response('Карта сайта собирается', status=503, headers={'Retry-After': '60'}, mimetype='text/plain')
+    return send_from_directory(current_app.config['SITEMAP_FOLDER'], sitemaps.INDEX_FILENAME,
+                               mimetype='application/xml', max_age=current_app.config['SITEMAP_MAX_AGE'])
+
+@bp.route('/sitemaps/<name>')
+def sitemap_shard(name):
+    if not sitemaps.SHARD_RE.match(name):
+        abort(404)
+    return send_from_directory(current_app.config['SITEMAP_FOLDER'], name,
+                               mimetype='application/gzip', max_age=current_app.config['SITEMAP_MAX_AGE'])
+
+@bp.route('/robots.txt')
+def robots_txt():
+    sitemap_url = current_app.config['SITE_URL'].rstrip('/') + url_for('main.sitemap_index')
+    return Response(f'User-agent: *\nAllow: /\nSitemap: {sitemap_url}\n', mimetype='text/plain')
+
+@bp.route('/healthz')
+def healthz():
+    """Проверка живости процесса (без обращения к БД)"""
+    return jsonify(status='ok')
+
+@bp.route('/readyz')
+def readyz():
+    """Проверка готовности: соединение с БД берется из пула приложения"""
+    try:
+        with db.engine.connect() as conn:
+            conn.execute(text('SELECT 1'))
+    except SQLAlchemyError as e:
+        current_app.logger.warning(f"Readiness check failed: {str(e)}")
+        return jsonify(status='unavailable'), 503
+    return jsonify(status='ok')
+
 @bp.route('/uploads/<path:filename>')
 def uploaded_file(filename):
     """Маршрут для отдачи загруженных файлов"""
@@ -497,12 +634,121 @@ def uploaded_file(filename):
         if attachment:
             mimetype = attachment.mimetype
 
+        observe_file_served(os.path.getsize(file_path))
         return send_from_directory(upload_folder, safe_filename, mimetype=mimetype)
 
     except Exception as e:
         current_app.logger.error(f"Error serving file {filename}: {str(e)}")
         abort(500)
 
+# ---------------- Возобновляемая загрузка файлов ----------------
+
+def get_upload_session_or_404(upload_id):
+    """Сессия загрузки текущего пользователя"""
+    upload_session = UploadSession.query.get_or_404(upload_id)
+    if upload_session.user_id != current_user.id:
+        abort(404)
+    return upload_session
+
+def upload_session_headers(upload_session):
+    return {
+        'Upload-Offset': str(upload_session.offset),
+        'Upload-Length': str(upload_session.total_size),
+        'Cache-Control': 'no-store',
+    }
+
+def upload_conflict(upload_session):
+    """409: клиент должен продолжить с offset, полученного сервером"""
+    return (jsonify(error='Неверное смещение', offset=upload_session.offset), 409,
+            upload_session_headers(upload_session))
+
+def upload_gone(upload_id):
+    """410: недозагруженный файл потерян, сессия удаляется, загрузку нужно начать заново"""
+    db.session.rollback()
+    upload_session = UploadSession.query.get(upload_id)
+    if upload_session is not None:
+        uploads.discard_session(upload_session)
+    return jsonify(error='Загрузка прервана на сервере, начните ее заново'), 410
+
+@bp.route('/post/<int:post_id>/uploads', methods=['POST'])
+@login_required
+def create_upload(post_id):
+    """Создает сессию загрузки: JSON {filename, size, mimetype}"""
+    post = Post.query.get_or_404(post_id)
+    if post.blog.owner != current_user:
+        return jsonify(error='Вы можете прикреплять файлы только к постам в своих блогах.'), 403
+
+    data = request.get_json(silent=True) or {}
+    original_filename = data.get('filename') or ''
+    size = data.get('size')
+    if not isinstance(size, int) or size <= 0:
+        return jsonify(error='Не указан размер файла'), 400
+
+    is_valid, validation_result = validate_upload_metadata(original_filename, data.get('mimetype'), size)
+    if not is_valid:
+        return jsonify(error=validation_result), 400
+
+    file_type = get_file_type(original_filename.rsplit('.', 1)[1].lower())
+    upload_session = uploads.create_session(post, current_user, original_filename, size, validation_result, file_type)
+    location = url_for('main.upload_status', upload_id=upload_session.id)
+    return (jsonify(id=upload_session.id, offset=0, location=location), 201,
+            {**upload_session_headers(upload_session), 'Location': location})
+
+@bp.route('/upload-sessions/<upload_id>', methods=['HEAD', 'GET'])
+@login_required
+def upload_status(upload_id):
+    """Сколько байт уже получено"""
+    upload_session = get_upload_session_or_404(upload_id)
+    return (jsonify(id=upload_session.id, offset=upload_session.offset, size=upload_session.total_size),
+            200, upload_session_headers(upload_session))
+
+@bp.route('/upload-sessions/<upload_id>', methods=['PATCH', 'PUT'])
+@login_required
+def upload_chunk(upload_id):
+    """Дописывает часть файла; заголовок Upload-Offset должен совпадать с уже полученным объемом"""
+    upload_session = get_upload_session_or_404(upload_id)
+
+    offset = request.headers.get('Upload-Offset', type=int)
+    if offset is None or offset != upload_session.offset:
+        return upload_conflict(upload_session)
+
+    length = request.content_length
+    if length is None:
+        return jsonify(error='Не указан Content-Length'), 411
+    if offset + length > upload_session.total_size:
+        return jsonify(error='Часть выходит за пределы файла'), 413
+
+    try:
+        upload_session = uploads.write_chunk(upload_session, offset, request.stream, length)
+    except uploads.UploadConflict:
+        db.session.rollback()
+        return upload_conflict(get_upload_session_or_404(upload_id))
+    except uploads.UploadGone:
+        return upload_gone(upload_id)
+    return '', 204, upload_session_headers(upload_session)
+
+@bp.route('/upload-sessions/<upload_id>/finalize', methods=['POST'])
+@login_required
+def finalize_upload(upload_id):
+    """Превращает полностью загруженный файл во вложение поста"""
+    upload_session = get_upload_session_or_404(upload_id)
+    if upload_session.offset != upload_session.total_size:
+        return jsonify(error='Файл загружен не полностью', offset=upload_session.offset), 409, upload_session_headers(upload_session)
+
+    try:
+        attachment = uploads.finalize_session(upload_session, unique_upload_filename(upload_session.original_filename))
+    except uploads.UploadGone:
+        return upload_gone(upload_id)
+    return jsonify(id=attachment.id, filename=attachment.filename,
+                   url=url_for('main.uploaded_file', filename=attachment.filename)), 201
+
+@bp.route('/upload-sessions/<upload_id>', methods=['DELETE'])
+@login_required
+def cancel_upload(upload_id):
+    """Отменяет загрузку"""
+    uploads.discard_session(get_upload_session_or_404(upload_id))
+    return '', 204
+
 # delete attachment
 @bp.route('/attachment/<int:attachment_id>/delete', methods=['POST'])
 @login_required
@@ -553,12 +799,53 @@ def profile():
 
     # Обработка изменения пароля
     if password_form.validate_on_submit():
-        if not check_password_hash(current_user.password, password_form.current_password.data):
-            flash('Текущий пароль введен неверно.', 'danger')
+        try:
+            if not passwords.check_password(current_user.password, password_form.current_password.data):
+                flash('Текущий пароль введен неверно.', 'danger')
+            else:
+                current_user.password = passwords.hash_password(password_form.new_password.data)
+                db.session.commit()
+                flash('Ваш пароль успешно изменен!', 'success')
+                return redirect(url_for('main.profile'))
+        except passwords.HashingBusy:
+            return password_busy('profile.html', form=form, password_form=password_form,
+                                 exports=exports.list_exports(current_user))
+
+    return render_template('profile.html', form=form, password_form=password_form,
+                           exports=exports.list_exports(current_user))
+
+# ---------------- Экспорт данных ----------------
+
+@bp.route('/profile/export')
+@login_required
+def export_data():
+    """Zip-архив с блогами, постами, комментариями и вложениями, собираемый на лету"""
+    if not exports.fits_streaming(current_user.id):
+        # Потоковая загрузка большого архива не уложится в timeout синхронного воркера
+        if exports.start_export(current_user):
+            flash('Архив слишком большой для прямой загрузки. Он собирается в фоне и появится в профиле, когда будет готов.', 'info')
         else:
-            current_user.password = generate_password_hash(password_form.new_password.data)
-            db.session.commit()
-            flash('Ваш пароль успешно изменен!', 'success')
-            return redirect(url_for('main.profile'))
+            flash('Архив уже собирается, дождитесь окончания.', 'warning')
+        return redirect(url_for('main.profile'))
+    response = Response(stream_with_context(exports.iter_export(current_user.id)), mimetype='application/zip')
+    response.headers['Content-Disposition'] = f'attachment; filename="{exports.export_filename(current_user)}"'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
 
-    return render_template('profile.html', form=form, password_form=password_form)
+@bp.route('/profile/export/background', methods=['POST'])
+@login_required
+def start_export():
+    if exports.start_export(current_user):
+        flash('Архив собирается. Он появится в профиле, когда будет готов.', 'info')
+    else:
+        flash('Архив уже собирается, дождитесь окончания.', 'warning')
+    return redirect(url_for('main.profile'))
+
+@bp.route('/profile/export/<token>')
+@login_required
+def download_export(token):
+    path = exports.export_path(current_user, token)
+    if path is None:
+        abort(404)
+    return send_file(path, mimetype='application/zip', as_attachment=True,
+                     download_name=exports.export_filename(current_user))
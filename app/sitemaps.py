@@ -0,0 +1,235 @@
+# app/sitemaps.py
+"""Карта сайта для поисковых роботов.
+
+sitemap.xml — индекс, ссылающийся на сжатые gzip файлы sitemap-<вид>-<N>.xml.gz
+в SITEMAP_FOLDER. Файл N содержит блоги или посты с id в диапазоне
+[N * SITEMAP_URLS_PER_FILE + 1, (N + 1) * SITEMAP_URLS_PER_FILE], поэтому в нем
+не больше SITEMAP_URLS_PER_FILE адресов, а изменение одного поста затрагивает
+только его файл. Строки (id, дата) читаются keyset-выборками по
+SITEMAP_BATCH_SIZE и сразу пишутся в gzip-поток.
+
+`flask sitemap build` собирает все файлы; при создании и удалении блогов и
+постов schedule_update пересобирает в фоне только затронутые файлы и индекс.
+Файлы отдаются как статические, с Last-Modified и ответом 304 на повторные запросы.
+"""
+import filecmp
+import gzip
+import os
+import re
+import tempfile
+import threading
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+import click
+from flask import current_app, url_for
+from flask.cli import AppGroup
+from sqlalchemy import func, select
+
+from app import background, db
+from app.models import Blog, Post
+
+sitemap_cli = AppGroup('sitemap', help='Карта сайта для поисковых роботов.')
+
+INDEX_FILENAME = 'sitemap.xml'
+SHARD_RE = re.compile(r'^sitemap-(blogs|posts)-(\d+)\.xml\.gz$')
+XMLNS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+# Файлы, уже поставленные в очередь на пересборку в этом процессе
+_pending = set()
+_full_build_pending = False
+_pending_lock = threading.Lock()
+
+
+def shard_filename(kind, shard):
+    return f'sitemap-{kind}-{shard}.xml.gz'
+
+
+def shard_of(object_id):
+    return (object_id - 1) // current_app.config['SITEMAP_URLS_PER_FILE']
+
+
+def _lastmod(value):
+    return f'{value:%Y-%m-%dT%H:%M:%S}+00:00'
+
+
+def _blog_rows(first_id, last_id):
+    """(id, дата последнего изменения) блогов: дата создания или последнего поста"""
+    latest_post = (
+        select(func.max(Post.created_at)).where(Post.blog_id == Blog.id)
+        .correlate(Blog).scalar_subquery()
+    )
+    return select(Blog.id, Blog.created_at, latest_post.label('latest_post')) \
+        .where(Blog.id >= first_id, Blog.id <= last_id).order_by(Blog.id)
+
+
+def _post_rows(first_id, last_id):
+    """(id, даты создания и последней правки) постов"""
+    return select(Post.id, Post.created_at, Post.updated_at) \
+        .where(Post.id >= first_id, Post.id <= last_id).order_by(Post.id)
+
+
+SHARD_KINDS = {
+    'blogs': (Blog, _blog_rows, 'main.blog', 'blog_id'),
+    'posts': (Post, _post_rows, 'main.post', 'post_id'),
+}
+
+
+def _iter_urls(kind, shard):
+    """(адрес, lastmod) для файла shard; строки читаются keyset-выборками"""
+    _, rows, endpoint, argument = SHARD_KINDS[kind]
+    per_file = current_app.config['SITEMAP_URLS_PER_FILE']
+    batch_size = current_app.config['SITEMAP_BATCH_SIZE']
+    last_id = shard * per_file + per_file
+    next_id = shard * per_file + 1
+    while next_id <= last_id:
+        batch = db.session.execute(rows(next_id, last_id).limit(batch_size)).all()
+        if not batch:
+            break
+        for row in batch:
+            modified = max((value for value in row[1:] if value is not None), default=None)
+            yield url_for(endpoint, **{argument: row.id}, _external=True), modified
+        next_id = batch[-1].id + 1
+
+
+def _write_atomic(path, write):
+    """Пишет файл через временный в той же папке: читатели не видят недописанный файл.
+
+    Если содержимое не изменилось, старый файл остается (и сохраняет Last-Modified).
+    """
+    folder = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        if not (os.path.exists(path) and filecmp.cmp(tmp_path, path, shallow=False)):
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def build_shard(kind, shard):
+    """Пересобирает один файл; возвращает число адресов (пустой файл удаляется)"""
+    folder = current_app.config['SITEMAP_FOLDER']
+    path = os.path.join(folder, shard_filename(kind, shard))
+    count = 0
+
+    def write(f):
+        nonlocal count
+        # mtime=0: одинаковое содержимое дает одинаковые байты, и файл не переписывается
+        with gzip.GzipFile(fileobj=f, mode='wb', mtime=0) as gz:
+            gz.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{XMLNS}">\n'.encode())
+            for loc, modified in _iter_urls(kind, shard):
+                entry = f'<url><loc>{escape(loc)}</loc>'
+                if modified is not None:
+                    entry += f'<lastmod>{_lastmod(modified)}</lastmod>'
+                gz.write(f'{entry}</url>\n'.encode())
+                count += 1
+            gz.write(b'</urlset>\n')
+
+    os.makedirs(folder, exist_ok=True)
+    with current_app.test_request_context(base_url=current_app.config['SITE_URL']):
+        _write_atomic(path, write)
+    if not count:
+        os.remove(path)
+    return count
+
+
+def build_index():
+    """Пересобирает sitemap.xml по файлам, лежащим в SITEMAP_FOLDER"""
+    folder = current_app.config['SITEMAP_FOLDER']
+    os.makedirs(folder, exist_ok=True)
+    shards = sorted(
+        (match.group(1), int(match.group(2)), name)
+        for name in os.listdir(folder) if (match := SHARD_RE.match(name))
+    )
+    base_url = current_app.config['SITE_URL'].rstrip('/')
+
+    def write(f):
+        f.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="{XMLNS}">\n'.encode())
+        for _, _, name in shards:
+            modified = datetime.utcfromtimestamp(os.path.getmtime(os.path.join(folder, name)))
+            f.write(f'<sitemap><loc>{escape(base_url)}/sitemaps/{name}</loc>'
+                    f'<lastmod>{_lastmod(modified)}</lastmod></sitemap>\n'.encode())
+        f.write(b'</sitemapindex>\n')
+
+    _write_atomic(index_path(), write)
+    return len(shards)
+
+
+def build_all():
+    """Собирает все файлы и индекс; удаляет файлы, которым больше не соответствуют строки"""
+    folder = current_app.config['SITEMAP_FOLDER']
+    expected = set()
+    for kind, (model, *_) in SHARD_KINDS.items():
+        max_id = db.session.scalar(select(func.max(model.id))) or 0
+        for shard in range(shard_of(max_id) + 1 if max_id else 0):
+            if build_shard(kind, shard):
+                expected.add(shard_filename(kind, shard))
+    for name in os.listdir(folder) if os.path.isdir(folder) else []:
+        if SHARD_RE.match(name) and name not in expected:
+            os.remove(os.path.join(folder, name))
+    build_index()
+    return len(expected)
+
+
+def _rebuild(shards):
+    # Изменения, сделанные после этой точки, снова поставят файл в очередь
+    with _pending_lock:
+        _pending.difference_update(shards)
+    if not os.path.exists(index_path()):
+        build_all()
+        return
+    for kind, shard in sorted(shards):
+        build_shard(kind, shard)
+    build_index()
+
+
+def schedule_update(blog_ids=(), post_ids=()):
+    """Пересобирает в фоне файлы с этими блогами и постами (вызывать после коммита).
+
+    Серия изменений в одном файле до начала пересборки дает одну пересборку.
+    """
+    shards = {('blogs', shard_of(blog_id)) for blog_id in blog_ids}
+    shards.update(('posts', shard_of(post_id)) for post_id in post_ids)
+    with _pending_lock:
+        shards -= _pending
+        _pending.update(shards)
+    if shards:
+        background.submit(_rebuild, shards)
+
+
+def _build_all_in_background():
+    global _full_build_pending
+    try:
+        build_all()
+    finally:
+        with _pending_lock:
+            _full_build_pending = False
+
+
+def schedule_build():
+    """Запускает полную сборку в фоне, если она еще не идет в этом процессе"""
+    global _full_build_pending
+    with _pending_lock:
+        if _full_build_pending:
+            return
+        _full_build_pending = True
+    background.submit(_build_all_in_background)
+
+
+def index_path():
+    return os.path.join(current_app.config['SITEMAP_FOLDER'], INDEX_FILENAME)
+
+
+def init_sitemaps(app):
+    app.cli.add_command(sitemap_cli)
+
+
+@sitemap_cli.command('build')
+def build_command():
+    """Собирает карту сайта целиком"""
+    count = build_all()
+    click.echo(f'Файлов карты сайта: {count}')
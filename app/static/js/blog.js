@@ -0,0 +1,17 @@
+// Подтверждение удаления блога
+document.addEventListener('DOMContentLoaded', function() {
+    const deleteModal = document.getElementById('deleteBlogModal');
+    if (deleteModal) {
+        const confirmInput = document.getElementById('confirmText');
+        const deleteBtn = document.getElementById('deleteBtn');
+        const blogTitle = deleteModal.dataset.blogTitle;
+
+        confirmInput.addEventListener('input', function() {
+            deleteBtn.disabled = this.value !== blogTitle;
+        });
+
+        deleteModal.addEventListener('shown.bs.modal', function() {
+            confirmInput.focus();
+        });
+    }
+});
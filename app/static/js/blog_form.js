@@ -0,0 +1,70 @@
+document.addEventListener('DOMContentLoaded', function() {
+    const previewBtn = document.getElementById('previewBtn');
+    const titleField = document.querySelector('input[name="title"]');
+    const descriptionField = document.querySelector('textarea[name="description"]');
+    const previewModal = new bootstrap.Modal(document.getElementById('previewModal'));
+    const previewTitle = document.getElementById('previewTitle');
+    const previewDescription = document.getElementById('previewDescription');
+
+    // Обработчик кнопки предпросмотра
+    if (previewBtn) {
+        previewBtn.addEventListener('click', function() {
+            const title = titleField?.value || 'Название блога';
+            const description = descriptionField?.value || 'Здесь будет описание вашего блога...';
+
+            previewTitle.textContent = title;
+            previewDescription.textContent = description;
+            previewModal.show();
+        });
+    }
+
+    // Автофокус на поле названия
+    if (titleField) {
+        titleField.focus();
+    }
+
+    // Подсчет символов для описания
+    if (descriptionField) {
+        descriptionField.addEventListener('input', function() {
+            const charCount = this.value.length;
+            const counter = document.getElementById('descriptionCounter') || 
+                (() => {
+                    const counter = document.createElement('div');
+                    counter.id = 'descriptionCounter';
+                    counter.className = 'form-text text-end';
+                    this.parentNode.appendChild(counter);
+                    return counter;
+                })();
+
+            counter.textContent = `${charCount} символов`;
+
+            if (charCount > 500) {
+                counter.classList.add('text-warning');
+            } else {
+                counter.classList.remove('text-warning');
+            }
+        });
+    }
+
+    // Восстановление сохраненных значений
+    const savedValues = JSON.parse(localStorage.getItem('blogFormData') || '{}');
+    if (titleField && savedValues.title) {
+        titleField.value = savedValues.title;
+    }
+    if (descriptionField && savedValues.description) {
+        descriptionField.value = savedValues.description;
+    }
+
+    // Автосохранение
+    [titleField, descriptionField].forEach(field => {
+        if (field) {
+            field.addEventListener('input', function() {
+                const formData = {
+                    title: titleField?.value || '',
+                    description: descriptionField?.value || ''
+                };
+                localStorage.setItem('blogFormData', JSON.stringify(formData));
+            });
+        }
+    });
+});
@@ -0,0 +1,19 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // Переключение видимости пароля
+    const togglePassword = document.getElementById('togglePassword');
+    const password = document.getElementById('password');
+
+    if (togglePassword && password) {
+        togglePassword.addEventListener('click', function() {
+            const type = password.getAttribute('type') === 'password' ? 'text' : 'password';
+            password.setAttribute('type', type);
+            this.innerHTML = type === 'password' ? '<i class="bi bi-eye"></i>' : '<i class="bi bi-eye-slash"></i>';
+        });
+    }
+
+    // Автофокус на первое поле
+    const emailField = document.querySelector('input[name="email"]');
+    if (emailField) {
+        emailField.focus();
+    }
+});
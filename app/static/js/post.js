@@ -0,0 +1,36 @@
+// Инициализация Fancybox для галереи
+Fancybox.bind("[data-fancybox]", {
+    Toolbar: {
+        display: {
+            left: [],
+            middle: [],
+            right: ["close"],
+        },
+    },
+    Thumbs: false,
+});
+
+// Подсветка нового комментария
+document.addEventListener('DOMContentLoaded', function() {
+    const commentId = new URLSearchParams(window.location.search).get('comment');
+    if (!commentId) {
+        return;
+    }
+    const commentElement = document.getElementById('comment-' + commentId);
+    if (commentElement) {
+        commentElement.scrollIntoView({ behavior: 'smooth', block: 'center' });
+        commentElement.style.backgroundColor = 'rgba(13, 110, 253, 0.05)';
+        commentElement.style.transition = 'background-color 0.5s ease';
+
+        setTimeout(() => {
+            commentElement.style.backgroundColor = '';
+        }, 5000);
+    }
+});
+
+// Подтверждение удаления
+document.querySelectorAll('form[onsubmit]').forEach(form => {
+    form.onsubmit = function() {
+        return confirm(this.getAttribute('data-confirm') || 'Вы уверены?');
+    };
+});
@@ -0,0 +1,244 @@
+document.addEventListener('DOMContentLoaded', function() {
+    const previewBtn = document.getElementById('previewBtn');
+    const postContent = document.getElementById('postContent');
+    const previewContent = document.getElementById('previewContent');
+    const previewModal = new bootstrap.Modal(document.getElementById('previewModal'));
+
+    // Функция для преобразования Markdown в HTML (упрощенная версия)
+    function simpleMarkdown(text) {
+        return text
+            .replace(/^# (.*$)/gm, '<h1>$1</h1>')
+            .replace(/^## (.*$)/gm, '<h2>$1</h2>')
+            .replace(/^### (.*$)/gm, '<h3>$1</h3>')
+            .replace(/\*\*(.*?)\*\*/g, '<strong>$1</strong>')
+            .replace(/\*(.*?)\*/g, '<em>$1</em>')
+            .replace(/`(.*?)`/g, '<code>$1</code>')
+            .replace(/```([\s\S]*?)```/g, '<pre><code>$1</code></pre>')
+            .replace(/\[(.*?)\]\((.*?)\)/g, '<a href="$2">$1</a>')
+            .replace(/^- (.*$)/gm, '<li>$1</li>')
+            .replace(/(<li>.*<\/li>)/g, '<ul>$1</ul>')
+            .replace(/\n/g, '<br>');
+    }
+
+    // Обработчик кнопки предпросмотра
+    if (previewBtn) {
+        previewBtn.addEventListener('click', function() {
+            const content = postContent.value || 'Здесь будет предпросмотр вашего поста...';
+            const htmlContent = simpleMarkdown(content);
+            previewContent.innerHTML = htmlContent;
+            previewModal.show();
+        });
+    }
+
+    // Автофокус на поле заголовка
+    const titleField = document.querySelector('input[name="title"]');
+    if (titleField) {
+        titleField.focus();
+    }
+
+    // Подсчет символов
+    if (postContent) {
+        postContent.addEventListener('input', function() {
+            const charCount = this.value.length;
+            const wordCount = this.value.split(/\s+/).filter(word => word.length > 0).length;
+
+            // Можно добавить отображение счетчика
+            console.log(`Символов: ${charCount}, Слов: ${wordCount}`);
+        });
+    }
+
+    // Загрузка больших файлов по частям (протокол — app/uploads.py).
+    // Адрес сессии хранится в localStorage: если связь оборвалась или страница
+    // перезагружена, повторный выбор того же файла продолжает загрузку с Upload-Offset.
+    const chunkedUpload = document.getElementById('chunkedUpload');
+    if (chunkedUpload) {
+        const createUrl = chunkedUpload.dataset.createUrl;
+        const chunkSize = parseInt(chunkedUpload.dataset.chunkSize, 10);
+        const fileInput = document.getElementById('chunkedFile');
+        const startBtn = document.getElementById('chunkedStart');
+        const cancelBtn = document.getElementById('chunkedCancel');
+        const progress = document.getElementById('chunkedProgress');
+        const progressBar = progress.querySelector('.progress-bar');
+        const statusText = document.getElementById('chunkedStatus');
+        const retryDelays = [1000, 2000, 5000, 10000, 30000];
+        let current = null;
+
+        class UploadGoneError extends Error {}
+
+        function storageKey(file) {
+            return `upload:${createUrl}:${file.name}:${file.size}:${file.lastModified}`;
+        }
+
+        function setStatus(text, isError = false) {
+            statusText.textContent = text;
+            statusText.classList.toggle('text-danger', isError);
+        }
+
+        function setProgress(offset, size) {
+            const percent = size ? Math.floor(offset * 100 / size) : 100;
+            progressBar.style.width = `${percent}%`;
+            progressBar.textContent = `${percent}%`;
+        }
+
+        function sleep(ms) {
+            return new Promise(resolve => setTimeout(resolve, ms));
+        }
+
+        async function errorMessage(response) {
+            const data = await response.json().catch(() => ({}));
+            return data.error || `Ошибка сервера (${response.status})`;
+        }
+
+        // Сколько байт уже получил сервер; null, если сессии больше нет
+        async function serverOffset(location) {
+            const response = await fetch(location, { method: 'HEAD', credentials: 'same-origin', cache: 'no-store' });
+            if (response.status === 404 || response.status === 410) {
+                return null;
+            }
+            if (!response.ok) {
+                throw new Error(`Ошибка сервера (${response.status})`);
+            }
+            return parseInt(response.headers.get('Upload-Offset'), 10);
+        }
+
+        async function createSession(file) {
+            const response = await fetch(createUrl, {
+                method: 'POST',
+                credentials: 'same-origin',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ filename: file.name, size: file.size, mimetype: file.type }),
+            });
+            if (!response.ok) {
+                throw new Error(await errorMessage(response));
+            }
+            return (await response.json()).location;
+        }
+
+        // Отправляет одну часть; возвращает смещение, которое подтвердил сервер
+        async function sendChunk(upload, offset) {
+            const response = await fetch(upload.location, {
+                method: 'PATCH',
+                credentials: 'same-origin',
+                signal: upload.abort.signal,
+                headers: {
+                    'Upload-Offset': String(offset),
+                    'Content-Type': 'application/offset+octet-stream',
+                },
+                body: upload.file.slice(offset, offset + chunkSize),
+            });
+            if (response.status === 204 || response.status === 409) {
+                // 409: сервер получил другой объем — продолжаем с его смещения
+                return parseInt(response.headers.get('Upload-Offset'), 10);
+            }
+            if (response.status === 404 || response.status === 410) {
+                throw new UploadGoneError(await errorMessage(response));
+            }
+            throw new Error(await errorMessage(response));
+        }
+
+        async function sendAll(upload, offset) {
+            let failures = 0;
+            while (offset < upload.file.size) {
+                setProgress(offset, upload.file.size);
+                try {
+                    offset = await sendChunk(upload, offset);
+                    failures = 0;
+                } catch (error) {
+                    if (upload.cancelled || error instanceof UploadGoneError || failures >= retryDelays.length) {
+                        throw error;
+                    }
+                    setStatus(`Связь прервалась, повтор через ${retryDelays[failures] / 1000} с...`);
+                    await sleep(retryDelays[failures++]);
+                    offset = await serverOffset(upload.location).catch(() => offset);
+                    if (offset === null) {
+                        throw new UploadGoneError('Загрузка прервана на сервере, начните ее заново');
+                    }
+                    setStatus(`Загрузка «${upload.file.name}»...`);
+                }
+            }
+            setProgress(offset, upload.file.size);
+        }
+
+        async function finalize(upload) {
+            const response = await fetch(`${upload.location}/finalize`, { method: 'POST', credentials: 'same-origin' });
+            if (response.status === 404 || response.status === 410) {
+                throw new UploadGoneError(await errorMessage(response));
+            }
+            if (!response.ok) {
+                throw new Error(await errorMessage(response));
+            }
+            return response.json();
+        }
+
+        async function startUpload(file) {
+            const key = storageKey(file);
+            const upload = { file, location: localStorage.getItem(key), abort: new AbortController(), cancelled: false };
+            current = upload;
+            startBtn.disabled = true;
+            cancelBtn.classList.remove('d-none');
+            progress.classList.remove('d-none');
+
+            try {
+                let offset = upload.location ? await serverOffset(upload.location) : null;
+                if (offset === null) {
+                    upload.location = await createSession(file);
+                    localStorage.setItem(key, upload.location);
+                    offset = 0;
+                    setStatus(`Загрузка «${file.name}»...`);
+                } else {
+                    setStatus(`Продолжение загрузки «${file.name}»...`);
+                }
+                await sendAll(upload, offset);
+                const attachment = await finalize(upload);
+                localStorage.removeItem(key);
+                statusText.textContent = 'Файл прикреплен к посту: ';
+                statusText.classList.remove('text-danger');
+                const link = document.createElement('a');
+                link.href = attachment.url;
+                link.textContent = file.name;
+                statusText.appendChild(link);
+                fileInput.value = '';
+            } catch (error) {
+                if (upload.cancelled) {
+                    return;
+                }
+                if (error instanceof UploadGoneError) {
+                    localStorage.removeItem(key);
+                }
+                setStatus(error instanceof UploadGoneError
+                    ? error.message
+                    : `${error.message}. Выберите файл снова, чтобы продолжить.`, true);
+            } finally {
+                if (current === upload) {
+                    current = null;
+                }
+                startBtn.disabled = false;
+                cancelBtn.classList.add('d-none');
+            }
+        }
+
+        startBtn.addEventListener('click', function() {
+            const file = fileInput.files[0];
+            if (!file) {
+                setStatus('Выберите файл.', true);
+                return;
+            }
+            startUpload(file);
+        });
+
+        cancelBtn.addEventListener('click', function() {
+            const upload = current;
+            if (!upload) {
+                return;
+            }
+            upload.cancelled = true;
+            upload.abort.abort();
+            localStorage.removeItem(storageKey(upload.file));
+            if (upload.location) {
+                fetch(upload.location, { method: 'DELETE', credentials: 'same-origin' });
+            }
+            progress.classList.add('d-none');
+            setStatus('Загрузка отменена.');
+        });
+    }
+});
@@ -0,0 +1,80 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // Элементы формы
+    const password = document.getElementById('password');
+    const confirmPassword = document.getElementById('confirmPassword');
+    const togglePassword = document.getElementById('togglePassword');
+    const showMismatch = document.getElementById('showMismatch');
+    const passwordStrength = document.getElementById('passwordStrength');
+    const passwordHint = document.getElementById('passwordHint');
+
+    // Переключение видимости пароля
+    if (togglePassword && password) {
+        togglePassword.addEventListener('click', function() {
+            const type = password.getAttribute('type') === 'password' ? 'text' : 'password';
+            password.setAttribute('type', type);
+            this.innerHTML = type === 'password' ? '<i class="bi bi-eye"></i>' : '<i class="bi bi-eye-slash"></i>';
+        });
+    }
+
+    // Проверка силы пароля
+    if (password) {
+        password.addEventListener('input', function() {
+            const pass = this.value;
+            let strength = 0;
+            let hint = '';
+            let color = '';
+
+            if (pass.length > 0) strength += 20;
+            if (pass.length >= 8) strength += 20;
+            if (/[A-Z]/.test(pass)) strength += 20;
+            if (/[0-9]/.test(pass)) strength += 20;
+            if (/[^A-Za-z0-9]/.test(pass)) strength += 20;
+
+            if (strength < 40) {
+                hint = 'Слабый пароль';
+                color = '#dc3545';
+            } else if (strength < 80) {
+                hint = 'Средний пароль';
+                color = '#ffc107';
+            } else {
+                hint = 'Сильный пароль';
+                color = '#198754';
+            }
+
+            passwordStrength.style.width = strength + '%';
+            passwordStrength.style.backgroundColor = color;
+            passwordHint.textContent = hint;
+            passwordHint.style.color = color;
+        });
+    }
+
+    // Показать несоответствие паролей
+    if (showMismatch && password && confirmPassword) {
+        showMismatch.addEventListener('change', function() {
+            if (this.checked && password.value !== confirmPassword.value) {
+                confirmPassword.style.borderColor = '#dc3545';
+                confirmPassword.style.boxShadow = '0 0 0 0.25rem rgba(220, 53, 69, 0.25)';
+            } else {
+                confirmPassword.style.borderColor = '';
+                confirmPassword.style.boxShadow = '';
+            }
+        });
+    }
+
+    // Проверка совпадения паролей
+    if (password && confirmPassword) {
+        confirmPassword.addEventListener('input', function() {
+            if (password.value !== this.value) {
+                this.style.borderColor = '#dc3545';
+            } else {
+                this.style.borderColor = '#198754';
+            }
+        });
+    }
+
+    // Автофокус на первое поле
+    const usernameField = document.querySelector('input[name="username"]');
+    if (usernameField) {
+        usernameField.focus();
+    }
+});
@@ -0,0 +1,223 @@
+# app/trending.py
+"""Рейтинг «популярное сейчас».
+
+Каждый лайк и комментарий дает вклад weight * 2 ** (-возраст / период полураспада).
+Чтобы не пересчитывать затухание при каждом чтении, хранится log2 суммы вкладов,
+отсчитанных от фиксированной точки TRENDING_EPOCH: вклад события в момент t равен
+log2(weight) + (t - TRENDING_EPOCH) / период. Порядок постов по такому значению
+совпадает с порядком по затухающему рейтингу в любой момент времени, поэтому
+главная страница читает топ одним запросом по индексу post_score.score.
+"""
+import math
+import random
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import Blog, Comment, Like, Post, PostScore, User
+
+TRENDING_EPOCH = datetime(2024, 1, 1)
+
+trending_cli = AppGroup('trending', help='Рейтинг популярных постов.')
+
+
+def _half_life_hours():
+    return current_app.config['TRENDING_HALF_LIFE_HOURS']
+
+
+def activity_score(weight, at):
+    """log2-вклад события с весом weight, произошедшего в момент at"""
+    hours = (at - TRENDING_EPOCH).total_seconds() / 3600
+    return math.log2(weight) + hours / _half_life_hours()
+
+
+def _log2_add(a, b):
+    """log2(2**a + 2**b) без переполнения"""
+    high, low = max(a, b), min(a, b)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def _log2_sub(a, b):
+    """log2(2**a - 2**b); None, если результат не положителен"""
+    if b >= a or a - b < 1e-9:
+        return None
+    return a + math.log2(1 - 2 ** (b - a))
+
+
+def record_activity(post_id, weight, at, removed=False):
+    """Инкрементально обновляет рейтинг поста при добавлении/удалении лайка или комментария.
+
+    Изменения попадают в текущую транзакцию; коммит делает вызывающий код.
+    """
+    delta = activity_score(weight, at)
+    score = PostScore.query.filter_by(post_id=post_id).with_for_update().first()
+
+    if removed:
+        if score is None:
+            return
+        new_score = _log2_sub(score.score, delta)
+        if new_score is None:
+            db.session.delete(score)
+        else:
+            score.score = new_score
+        return
+
+    if score is None:
+        try:
+            # Другой воркер мог создать строку одновременно с нами
+            with db.session.begin_nested():
+                db.session.add(PostScore(post_id=post_id, score=delta))
+            return
+        except IntegrityError:
+            score = PostScore.query.filter_by(post_id=post_id).with_for_update().one()
+    score.score = _log2_add(score.score, delta)
+
+
+def record_like(like, removed=False):
+    record_activity(like.post_id, current_app.config['TRENDING_LIKE_WEIGHT'], like.created_at or datetime.utcnow(), removed)
+
+
+def record_comment(comment, removed=False):
+    record_activity(comment.post_id, current_app.config['TRENDING_COMMENT_WEIGHT'], comment.created_at or datetime.utcnow(), removed)
+
+
+def top_posts(limit=None):
+    """Самые популярные посты: один запрос по индексу рейтинга"""
+    limit = limit or current_app.config['TRENDING_TOP_N']
+    return (Post.query
+            .join(PostScore, PostScore.post_id == Post.id)
+            .options(db.joinedload(Post.blog))
+            .order_by(PostScore.score.desc())
+            .limit(limit)
+            .all())
+
+
+def refresh_scores(batch_size=10000, commit=True):
+    """Пересчитывает рейтинг с нуля по лайкам и комментариям за окно TRENDING_WINDOW_DAYS.
+
+    Исправляет накопившиеся при инкрементальных обновлениях погрешности.
+    Строки читаются потоком, в памяти хранится только сумма на пост.
+    commit=False оставляет изменения в текущей транзакции (для замеров).
+    """
+    config = current_app.config
+    now = datetime.utcnow()
+    cutoff = now - timedelta(days=config['TRENDING_WINDOW_DAYS'])
+    half_life_seconds = config['TRENDING_HALF_LIFE_HOURS'] * 3600
+
+    # Суммы считаются относительно текущего момента (вклады <= weight, переполнения нет)
+    totals = defaultdict(float)
+    sources = (
+        (Like, config['TRENDING_LIKE_WEIGHT']),
+        (Comment, config['TRENDING_COMMENT_WEIGHT']),
+    )
+    for model, weight in sources:
+        rows = (db.session.query(model.post_id, model.created_at)
+                .filter(model.created_at >= cutoff)
+                .execution_options(yield_per=batch_size))
+        for post_id, created_at in rows:
+            totals[post_id] += weight * 2 ** ((created_at - now).total_seconds() / half_life_seconds)
+
+    now_score = activity_score(1, now)
+    db.session.query(PostScore).delete(synchronize_session=False)
+    db.session.bulk_insert_mappings(PostScore, [
+        {'post_id': post_id, 'score': now_score + math.log2(total), 'updated_at': now}
+        for post_id, total in totals.items() if total > 0
+    ])
+    if commit:
+        db.session.commit()
+    return len(totals)
+
+
+def _generate_likes(total, batch_size):
+    """Создает в текущей транзакции total лайков от временных пользователей к временным постам.
+
+    Постов не больше 1000, пользователей — сколько нужно для уникальных пар (пользователь, пост);
+    даты лайков равномерно распределены по окну TRENDING_WINDOW_DAYS. Возвращает id лайков-образцов.
+    """
+    prefix = f'bench-{uuid.uuid4().hex[:8]}'
+    posts_count = min(1000, total)
+    users_count = -(-total // posts_count)
+    db.session.execute(insert(User), [
+        {'username': f'{prefix}-{i}', 'email': f'{prefix}-{i}@example.invalid', 'password': '!'}
+        for i in range(users_count)
+    ])
+    user_ids = db.session.scalars(select(User.id).where(User.username.like(f'{prefix}-%')).order_by(User.id)).all()
+    owner = Blog(owner_id=user_ids[0], title=prefix, description='')
+    db.session.add(owner)
+    db.session.flush()
+    db.session.execute(insert(Post), [
+        {'blog_id': owner.id, 'title': f'{prefix}-{i}', 'content': ''} for i in range(posts_count)
+    ])
+    post_ids = db.session.scalars(select(Post.id).where(Post.blog_id == owner.id).order_by(Post.id)).all()
+
+    now = datetime.utcnow()
+    window_seconds = current_app.config['TRENDING_WINDOW_DAYS'] * 86400
+    batch = []
+    for index in range(total):
+        batch.append({
+            'user_id': user_ids[index // posts_count],
+            'post_id': post_ids[index % posts_count],
+            'created_at': now - timedelta(seconds=random.uniform(0, window_seconds)),
+        })
+        if len(batch) == batch_size:
+            db.session.execute(insert(Like), batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(Like), batch)
+    return post_ids
+
+
+def init_trending(app):
+    app.cli.add_command(trending_cli)
+
+
+@trending_cli.command('refresh')
+@click.option('--batch-size', default=10000, show_default=True, help='Размер пакета при чтении лайков и комментариев.')
+def refresh_command(batch_size):
+    """Пересчитывает рейтинг популярных постов с нуля"""
+    started = time.perf_counter()
+    count = refresh_scores(batch_size)
+    click.echo(f'Рейтинг пересчитан для {count} постов за {time.perf_counter() - started:.2f} с')
+
+
+@trending_cli.command('benchmark')
+@click.option('--likes', default=100000, show_default=True, help='Сколько лайков сгенерировать.')
+@click.option('--batch-size', default=10000, show_default=True, help='Размер пакета вставки и чтения.')
+@click.option('--samples', default=1000, show_default=True, help='Инкрементальных обновлений для замера.')
+def benchmark_command(likes, batch_size, samples):
+    """Стоимость инкрементального обновления и полного пересчета рейтинга при --likes лайках.
+
+    Лайки, временные пользователи и посты создаются в одной транзакции, которая
+    в конце откатывается. На PostgreSQL пересчет удерживает блокировку post_score
+    до отката: запускайте на копии базы, а не на рабочей.
+    """
+    db.session.rollback()
+    try:
+        started = time.perf_counter()
+        post_ids = _generate_likes(likes, batch_size)
+        generated = time.perf_counter() - started
+
+        like_weight = current_app.config['TRENDING_LIKE_WEIGHT']
+        started = time.perf_counter()
+        for index in range(samples):
+            record_activity(post_ids[index % len(post_ids)], like_weight, datetime.utcnow())
+            db.session.flush()
+        incremental = (time.perf_counter() - started) / samples
+
+        started = time.perf_counter()
+        count = refresh_scores(batch_size, commit=False)
+        full = time.perf_counter() - started
+    finally:
+        db.session.rollback()
+
+    click.echo(f'Сгенерировано лайков:       {likes} за {generated:.1f} с (откачено)')
+    click.echo(f'Инкрементальное обновление: {incremental * 1e3:.3f} мс на лайк (не зависит от числа лайков)')
+    click.echo(f'Полный пересчет:            {full:.2f} с, {count} постов, {likes / full:,.0f} лайков/с')
@@ -0,0 +1,223 @@
+# app/uploads.py
+"""Возобновляемая загрузка больших файлов по частям (протокол в духе tus).
+
+1. POST /post/<id>/uploads — создать сессию (имя, размер, MIME-тип файла);
+2. PATCH или PUT /upload-sessions/<id> с заголовком Upload-Offset — дописать часть;
+3. HEAD /upload-sessions/<id> — узнать, сколько байт уже получено (после обрыва связи);
+4. POST /upload-sessions/<id>/finalize — превратить загруженный файл во вложение поста.
+
+Части пишутся на диск прямо из потока запроса, файл целиком в памяти не держится.
+Пока часть принимается, файл сессии заблокирован через flock (вторая часть той же
+сессии получает UploadConflict), а строка в базе не блокируется: FOR UPDATE
+берется только на короткую проверку смещения и его коммит (периодически и после записи).
+Клиент для браузера — static/js/post_form.js.
+"""
+import os
+import shutil
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from werkzeug.exceptions import ClientDisconnected
+
+try:
+    import fcntl
+except ImportError:  # Windows: одновременные части одной сессии не исключаются
+    fcntl = None
+
+from app import db
+from app.models import Attachment, UploadSession
+from app.metrics import observe_upload
+
+uploads_cli = AppGroup('uploads', help='Возобновляемые загрузки файлов.')
+
+STREAM_BLOCK_SIZE = 64 * 1024
+
+
+class UploadConflict(Exception):
+    """Смещение клиента не совпадает с полученным, или часть этой сессии уже принимается"""
+
+
+class UploadGone(Exception):
+    """Сессия или ее недозагруженный файл удалены; загрузку нужно начать заново"""
+
+
+def max_upload_size(file_type):
+    """Максимальный размер файла данного типа"""
+    limits = current_app.config['UPLOAD_MAX_SIZES']
+    return limits.get(file_type, limits['other'])
+
+
+def partial_path(upload_session):
+    """Путь к недозагруженному файлу сессии"""
+    return os.path.join(current_app.config['UPLOAD_TMP_FOLDER'], upload_session.id)
+
+
+def create_session(post, user, original_filename, total_size, mimetype, file_type):
+    """Создает сессию загрузки и пустой файл для нее"""
+    upload_session = UploadSession(
+        id=uuid.uuid4().hex,
+        post_id=post.id,
+        user_id=user.id,
+        original_filename=original_filename,
+        mimetype=mimetype,
+        file_type=file_type,
+        total_size=total_size,
+        offset=0,
+    )
+    os.makedirs(current_app.config['UPLOAD_TMP_FOLDER'], exist_ok=True)
+    open(partial_path(upload_session), 'wb').close()
+    db.session.add(upload_session)
+    db.session.commit()
+    return upload_session
+
+
+def _open_partial(upload_session):
+    """Открывает файл сессии и блокирует его на время записи части"""
+    try:
+        f = open(partial_path(upload_session), 'r+b')
+    except FileNotFoundError:
+        raise UploadGone()
+    if fcntl is not None:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            f.close()
+            raise UploadConflict()
+    return f
+
+
+def _commit_offset(session_id, expected, new_offset):
+    """Под блокировкой строки проверяет, что смещение не менялось, и сохраняет новое"""
+    upload_session = UploadSession.query.filter_by(id=session_id).with_for_update().first()
+    if upload_session is None:
+        db.session.rollback()
+        raise UploadGone()
+    if upload_session.offset != expected:
+        db.session.rollback()
+        raise UploadConflict()
+    upload_session.offset = new_offset
+    db.session.commit()
+    return upload_session
+
+
+def write_chunk(upload_session, offset, stream, length):
+    """Дописывает в файл сессии с позиции offset length байт из потока запроса.
+
+    Тело читается без открытой транзакции; полученные байты сохраняются в
+    смещении каждые UPLOAD_COMMIT_INTERVAL секунд и в конце части (строка
+    сессии блокируется только на эту проверку и коммит). Если клиент оборвал
+    соединение или воркер убит по таймауту посреди части, загрузку можно
+    продолжить с последнего сохраненного смещения. Возвращает сессию с новым
+    смещением.
+    """
+    session_id = upload_session.id
+    commit_interval = current_app.config['UPLOAD_COMMIT_INTERVAL']
+    written = 0
+    with _open_partial(upload_session) as f:
+        # Смещение перечитывается под flock: предыдущая часть могла закончиться после проверки в маршруте
+        upload_session = db.session.get(UploadSession, session_id, populate_existing=True)
+        if upload_session is None:
+            raise UploadGone()
+        if offset != upload_session.offset:
+            raise UploadConflict()
+        if os.fstat(f.fileno()).st_size < offset:
+            # Файл короче подтвержденного смещения: данные потеряны
+            raise UploadGone()
+        # Завершаем читающую транзакцию, чтобы не держать ее открытой во время приема
+        db.session.commit()
+
+        f.seek(offset)
+        # Хвост, оставшийся от оборванной записи, отбрасывается
+        f.truncate()
+        committed = 0
+        committed_at = time.monotonic()
+        try:
+            while written < length:
+                data = stream.read(min(STREAM_BLOCK_SIZE, length - written))
+                if not data:
+                    break
+                f.write(data)
+                written += len(data)
+                if time.monotonic() - committed_at >= commit_interval:
+                    # Медленный клиент: принятое сохраняется, не дожидаясь конца части
+                    f.flush()
+                    _commit_offset(session_id, offset + committed, offset + written)
+                    committed = written
+                    committed_at = time.monotonic()
+        except ClientDisconnected:
+            pass
+        f.flush()
+
+        # Файл еще заблокирован: смещение фиксируется до того, как следующая часть начнет запись
+        upload_session = _commit_offset(session_id, offset + committed, offset + written)
+    return upload_session
+
+
+def finalize_session(upload_session, filename):
+    """Переносит загруженный файл в UPLOAD_FOLDER под именем filename и создает вложение"""
+    path = partial_path(upload_session)
+    if not os.path.exists(path):
+        raise UploadGone()
+    destination = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
+    shutil.move(path, destination)
+    observe_upload(upload_session.total_size, upload_session.file_type)
+
+    attachment = Attachment(
+        post_id=upload_session.post_id,
+        user_id=upload_session.user_id,
+        filename=filename,
+        original_filename=upload_session.original_filename,
+        mimetype=upload_session.mimetype,
+        file_type=upload_session.file_type,
+    )
+    db.session.add(attachment)
+    db.session.delete(upload_session)
+    db.session.commit()
+    return attachment
+
+
+def discard_session(upload_session):
+    """Удаляет сессию и ее недозагруженный файл"""
+    path = partial_path(upload_session)
+    if os.path.exists(path):
+        os.remove(path)
+    db.session.delete(upload_session)
+    db.session.commit()
+
+
+def cleanup_sessions():
+    """Удаляет брошенные сессии и файлы без сессий; возвращает число удаленных сессий"""
+    ttl = timedelta(hours=current_app.config['UPLOAD_SESSION_TTL_HOURS'])
+    cutoff = datetime.utcnow() - ttl
+    expired = UploadSession.query.filter(UploadSession.updated_at < cutoff).all()
+    for upload_session in expired:
+        path = partial_path(upload_session)
+        if os.path.exists(path):
+            os.remove(path)
+        db.session.delete(upload_session)
+    db.session.commit()
+
+    # Файлы, для которых сессии уже нет (например, после ручного удаления строк)
+    tmp_folder = current_app.config['UPLOAD_TMP_FOLDER']
+    if os.path.isdir(tmp_folder):
+        known = {session_id for (session_id,) in db.session.query(UploadSession.id)}
+        for name in os.listdir(tmp_folder):
+            path = os.path.join(tmp_folder, name)
+            if name not in known and os.path.getmtime(path) < time.time() - ttl.total_seconds():
+                os.remove(path)
+    return len(expired)
+
+
+def init_uploads(app):
+    app.cli.add_command(uploads_cli)
+
+
+@uploads_cli.command('cleanup')
+def cleanup_command():
+    """Удаляет брошенные сессии загрузки"""
+    count = cleanup_sessions()
+    click.echo(f'Удалено брошенных загрузок: {count}')
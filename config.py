@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Загружаем переменные окружения из .env файла
@@ -16,4 +17,117 @@ class Config:
 
     UPLOAD_FOLDER = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'static/uploads')
 
+    # Недозагруженные файлы возобновляемых загрузок
+    UPLOAD_TMP_FOLDER = os.environ.get('UPLOAD_TMP_FOLDER') or \
+        os.path.join(os.path.abspath(os.path.dirname(__file__)), 'static/uploads_tmp')
+
+    # Максимальный размер одного запроса (форма или одна часть возобновляемой загрузки)
     MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # 50 MB
+
+    # Максимальный размер файла по типу; большие файлы загружаются по частям
+    UPLOAD_MAX_SIZES = {
+        'image': 20 * 1024 * 1024,  # 20 MB
+        'audio': 200 * 1024 * 1024,  # 200 MB
+        'video': 2 * 1024 * 1024 * 1024,  # 2 GB
+        'document': 50 * 1024 * 1024,  # 50 MB
+        'other': 50 * 1024 * 1024,  # 50 MB
+    }
+
+    # Размер одной части при загрузке из браузера (меньше MAX_CONTENT_LENGTH);
+    # на канале 500 кбит/с часть в 2 MB принимается ~35 с, с запасом до timeout воркера (120 с)
+    UPLOAD_CHUNK_SIZE = 2 * 1024 * 1024  # 2 MB
+    # Как часто (в секундах) сохраняется смещение, пока часть еще принимается
+    UPLOAD_COMMIT_INTERVAL = 10
+
+    # Через сколько часов без новых частей загрузка считается брошенной
+    UPLOAD_SESSION_TTL_HOURS = 24
+
+    # Срок кеширования статических файлов с хешем в имени (flask assets build)
+    STATIC_MAX_AGE = 365 * 24 * 60 * 60  # 1 год
+
+    # Кеш байткода Jinja, общий для всех воркеров gunicorn
+    JINJA_CACHE_DIR = os.environ.get('JINJA_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'web_blog_jinja_cache')
+
+    # Компиляция всех шаблонов при создании приложения, а не при первом запросе
+    PRECOMPILE_TEMPLATES = os.environ.get('PRECOMPILE_TEMPLATES', 'true').lower() == 'true'
+
+    # Метрики Prometheus: доля запросов, для которых измеряются время, SQL и рендеринг
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+    METRICS_SAMPLE_RATE = float(os.environ.get('METRICS_SAMPLE_RATE', '0.1'))
+
+    # Рейтинг «популярное сейчас»
+    TRENDING_HALF_LIFE_HOURS = 24  # Через сколько часов вклад лайка/комментария уменьшается вдвое
+    TRENDING_LIKE_WEIGHT = 1.0
+    TRENDING_COMMENT_WEIGHT = 2.0
+    TRENDING_WINDOW_DAYS = 14  # Более старые события при пересчете не учитываются
+    TRENDING_TOP_N = 5
+
+    # Похожие посты по тегам
+    RELATED_TOP_K = 5  # Сколько соседей хранится и показывается для поста
+    RELATED_MAX_TAG_POSTS = 5000  # Слишком распространенные теги не участвуют в переборе пар
+
+    # Потоковый рендеринг больших страниц (пост, блог)
+    STREAM_TEMPLATES = os.environ.get('STREAM_TEMPLATES', 'false').lower() == 'true'
+    STREAM_CHUNK_SIZE = 8 * 1024  # Размер блока, после которого данные отправляются клиенту
+
+    # Секционирование comment и like по месяцам (PostgreSQL, flask partitions ...)
+    PARTITION_MONTHS_AHEAD = 3  # На сколько месяцев вперед создаются секции
+    PARTITION_ARCHIVE_SCHEMA = 'archive'  # Куда переносятся отсоединенные старые секции
+
+    # Потоков для фоновых задач в каждом воркере (рассылка уведомлений, карта сайта)
+    BACKGROUND_THREADS = 2
+
+    # Экспорт данных пользователя (zip-архив)
+    EXPORT_FOLDER = os.environ.get('EXPORT_FOLDER') or \
+        os.path.join(os.path.abspath(os.path.dirname(__file__)), 'exports')
+    EXPORT_TTL_HOURS = 48  # Сколько хранятся архивы, подготовленные в фоне
+    EXPORT_THREADS = 1  # Отдельный пул фоновой сборки архивов в каждом воркере
+    EXPORT_YIELD_PER = 500  # Строк на одну выборку серверного курсора
+    # Больше этого архив не отдается потоком, а собирается в фоне: потоковая загрузка
+    # должна уложиться в timeout воркера gunicorn (120 с) даже на медленном канале
+    EXPORT_STREAM_MAX_POSTS = 2000
+    EXPORT_STREAM_MAX_BYTES = 20 * 1024 * 1024  # 20 MB вложений
+
+    # Карта сайта (flask sitemap build)
+    SITEMAP_FOLDER = os.environ.get('SITEMAP_FOLDER') or \
+        os.path.join(os.path.abspath(os.path.dirname(__file__)), 'sitemaps')
+    SITEMAP_URLS_PER_FILE = 50000  # Ограничение протокола sitemaps.org
+    SITEMAP_BATCH_SIZE = 5000  # Строк на одну keyset-выборку
+    SITEMAP_MAX_AGE = 60 * 60  # Срок кеширования файлов карты сайта
+
+    # Хеширование паролей (время для разных параметров: flask passwords benchmark)
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')  # Старые хеши пересчитываются при входе
+    PASSWORD_HASH_CONCURRENCY = int(os.environ.get('PASSWORD_HASH_CONCURRENCY', 2))  # Одновременных хешей на сервер; меньше числа воркеров
+    PASSWORD_HASH_WAIT = 1.0  # Секунд ожидания слота, потом ответ 503
+    PASSWORD_HASH_SLOTS_DIR = os.path.join(tempfile.gettempdir(), 'web_blog_password_slots')  # Файлы слотов, общие для воркеров
+
+    # Счетчик просмотров постов: накапливается в воркере и записывается пачками
+    VIEWS_ENABLED = os.environ.get('VIEWS_ENABLED', 'true').lower() == 'true'
+    VIEWS_FLUSH_INTERVAL = 10  # Секунд между записями в БД (предел потерь при падении воркера)
+    VIEWS_FLUSH_THRESHOLD = 1000  # Запись раньше срока, если накопилось столько просмотров
+
+    # Уведомления подписчиков о новых постах
+    NOTIFY_ASYNC = os.environ.get('NOTIFY_ASYNC', 'true').lower() == 'true'  # Рассылка в фоновом потоке, а не в запросе
+    NOTIFY_CHUNK_SIZE = 1000  # Подписчиков на одну пачку вставки уведомлений
+    NOTIFY_RETRY_AFTER = 5 * 60  # Через сколько секунд незаконченная рассылка повторяется (flask notifications retry-pending)
+    NOTIFICATIONS_PER_PAGE = 20
+
+    # Письма-дайджесты (flask notifications send-digests)
+    NOTIFY_EMAIL_ENABLED = os.environ.get('NOTIFY_EMAIL_ENABLED', 'true').lower() == 'true'
+    NOTIFY_DIGEST_BATCH_SIZE = 500  # Получателей на одну пачку писем
+    NOTIFY_SMTP_CONNECTIONS = 4  # Одновременных SMTP-соединений при отправке пачки
+    SITE_URL = os.environ.get('SITE_URL') or 'http://localhost:5000'  # Для ссылок в письмах и карте сайта
+    MAIL_SERVER = os.environ.get('MAIL_SERVER') or 'localhost'
+    MAIL_PORT = int(os.environ.get('MAIL_PORT') or 1025)  # Локальный SMTP-сервер для разработки
+    MAIL_USE_TLS = os.environ.get('MAIL_USE_TLS', 'false').lower() == 'true'
+    MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
+    MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
+    MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER') or 'DailyPage <noreply@dailypage.local>'
+    MAIL_TIMEOUT = 10  # Секунд на SMTP-операцию
+
+    # Сжатие ответов gzip/brotli
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', 'true').lower() == 'true'
+    COMPRESS_MIMETYPES = {'text/html', 'application/json'}
+    COMPRESS_MIN_SIZE = 1024  # Меньшие ответы не сжимаются
+    COMPRESS_LEVEL = 6  # Уровень gzip
+    COMPRESS_BR_QUALITY = 5  # Качество brotli для динамических ответов
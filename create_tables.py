@@ -16,17 +16,13 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 def wait_for_db(max_retries=30, delay=1):
-    """Ждем, пока база данных станет доступной"""
-    from sqlalchemy import create_engine, text
+    """Ждем, пока база данных станет доступной (используется пул соединений приложения)"""
+    from sqlalchemy import text
     from sqlalchemy.exc import OperationalError
     
-    db_url = os.environ.get('DATABASE_URL') or \
-        'postgresql://blog_user:blog_password@db:5432/blogdb'
-    
     for i in range(max_retries):
         try:
-            engine = create_engine(db_url.replace('postgresql://', 'postgresql+psycopg2://'))
-            with engine.connect() as conn:
+            with db.engine.connect() as conn:
                 conn.execute(text('SELECT 1'))
             logger.info("База данных доступна")
             return True
@@ -77,6 +73,15 @@ def init_db():
                         except Exception as create_error:
                             logger.error(f"Ошибка при создании таблиц: {create_error}")
                             logger.info("Таблицы, возможно, уже существуют")
+
+                # Секции комментариев и лайков на ближайшие месяцы (если таблицы секционированы)
+                try:
+                    from app.partitioning import maintain_partitions
+                    created = maintain_partitions()
+                    if created:
+                        logger.info(f"Созданы секции: {', '.join(created)}")
+                except Exception as e:
+                    logger.warning(f"Ошибка при создании секций: {e}")
             else:
                 # Если миграции не инициализированы, создаем таблицы напрямую
                 logger.info("Миграции не инициализированы, создаем таблицы напрямую...")
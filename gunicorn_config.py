@@ -1,4 +1,14 @@
 # Gunicorn configuration file for Flask application
+import os
+import shutil
+import tempfile
+
+# Shared directory where every worker writes its Prometheus metrics.
+# It must exist before the application (and prometheus_client) is imported,
+# and starts empty so values from a previous run are not merged in
+metrics_dir = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'web_blog_metrics'))
+shutil.rmtree(metrics_dir, ignore_errors=True)
+os.makedirs(metrics_dir, exist_ok=True)
 
 # Bind to 0.0.0.0:5000 to make it accessible from outside the container
 bind = "0.0.0.0:5000"
@@ -15,6 +25,13 @@ timeout = 120
 # Number of requests a worker will process before restarting
 max_requests = 1000
 
+# Randomize restarts so workers are not recycled all at once
+max_requests_jitter = 100
+
+# Load the application (and precompile templates) once in the master process;
+# workers are forked with everything already imported
+preload_app = True
+
 # Log level
 loglevel = "info"
 
@@ -29,3 +46,27 @@ graceful_timeout = 30
 
 # Keep alive connections
 keepalive = 2
+
+
+def child_exit(server, worker):
+    """Let prometheus_client drop live gauges of a recycled worker"""
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def worker_exit(server, worker):
+    """Write post views buffered in this worker before it exits"""
+    from app.post_views import flush_on_exit
+    from run import app
+
+    flush_on_exit(app)
+
+
+def post_fork(server, worker):
+    """Drop DB connections inherited from the master so workers never share sockets"""
+    from app import db
+    from run import app
+
+    with app.app_context():
+        db.engine.dispose(close=False)
@@ -0,0 +1,41 @@
+"""Comment and like created_at not null
+
+Дата обязательна: по ней секционируются comment и like (app/partitioning.py),
+и в секционированных таблицах колонка уже NOT NULL.
+
+Revision ID: 3f8a6d2e9b17
+Revises: 9e4b2c7d1f05
+Create Date: 2026-10-19 19:05:12.338410
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f8a6d2e9b17'
+down_revision = '9e4b2c7d1f05'
+branch_labels = None
+depends_on = None
+
+TABLES = ('comment', 'like')
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for table in TABLES:
+        column = next(column for column in inspector.get_columns(table) if column['name'] == 'created_at')
+        # Секционированная таблица или db.create_all() уже дали NOT NULL
+        if not column['nullable']:
+            continue
+        op.execute(sa.table(table, sa.column('created_at'))
+                   .update().where(sa.column('created_at').is_(None))
+                   .values(created_at=sa.func.current_timestamp()))
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=True)
@@ -0,0 +1,33 @@
+"""Post updated at
+
+Дата последней правки поста: lastmod поста в карте сайта (app/sitemaps.py).
+У постов без правок она пуста, и lastmod берется из created_at.
+
+Revision ID: 4c8e1b5f7a23
+Revises: b7d41e6a2c90
+Create Date: 2026-10-19 21:40:18.604127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4c8e1b5f7a23'
+down_revision = 'b7d41e6a2c90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Колонка могла быть создана через db.create_all()
+    if 'updated_at' in {column['name'] for column in sa.inspect(op.get_bind()).get_columns('post')}:
+        return
+
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
@@ -0,0 +1,32 @@
+"""Post views
+
+Счетчик просмотров поста (записывается пачками, см. app/post_views.py).
+
+Revision ID: 5c1d7e9a3b42
+Revises: 728a651af780
+Create Date: 2026-10-19 17:02:41.905316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c1d7e9a3b42'
+down_revision = '728a651af780'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Колонка могла быть создана через db.create_all()
+    if 'views' in {column['name'] for column in sa.inspect(op.get_bind()).get_columns('post')}:
+        return
+
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('views', sa.BigInteger(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.drop_column('views')
@@ -0,0 +1,59 @@
+"""Notifications
+
+Таблица уведомлений подписчиков и кеш числа непрочитанных у пользователя.
+
+Revision ID: 728a651af780
+Revises: ae564d387ccb
+Create Date: 2026-10-19 16:40:12.184705
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '728a651af780'
+down_revision = 'ae564d387ccb'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    # Колонка и таблица могли быть созданы через db.create_all()
+    if 'unread_notifications' not in {column['name'] for column in inspector.get_columns('user')}:
+        with op.batch_alter_table('user', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('unread_notifications', sa.Integer(), server_default='0', nullable=False))
+
+    if inspector.has_table('notification'):
+        return
+
+    op.create_table('notification',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('post_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('read_at', sa.DateTime(), nullable=True),
+    sa.Column('emailed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['post_id'], ['post.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.create_index('uq_notification_user_id_post_id', ['user_id', 'post_id'], unique=True)
+        batch_op.create_index('ix_notification_user_id_id', ['user_id', 'id'], unique=False)
+        batch_op.create_index('ix_notification_post_id', ['post_id'], unique=False)
+        batch_op.create_index('ix_notification_unread', ['user_id'], unique=False,
+                              postgresql_where=sa.text('read_at IS NULL'),
+                              sqlite_where=sa.text('read_at IS NULL'))
+        batch_op.create_index('ix_notification_pending_email', ['user_id'], unique=False,
+                              postgresql_where=sa.text('emailed_at IS NULL AND read_at IS NULL'),
+                              sqlite_where=sa.text('emailed_at IS NULL AND read_at IS NULL'))
+
+
+def downgrade():
+    op.drop_table('notification')
+
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('unread_notifications')
@@ -0,0 +1,36 @@
+"""Post notify pending
+
+Отметка незаконченной рассылки уведомлений о посте (см. app/notifications.py).
+
+Revision ID: 9e4b2c7d1f05
+Revises: 5c1d7e9a3b42
+Create Date: 2026-10-19 18:20:37.512904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e4b2c7d1f05'
+down_revision = '5c1d7e9a3b42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Колонка могла быть создана через db.create_all()
+    if 'notify_pending' in {column['name'] for column in sa.inspect(op.get_bind()).get_columns('post')}:
+        return
+
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('notify_pending', sa.Boolean(), server_default=sa.false(), nullable=False))
+        batch_op.create_index('ix_post_notify_pending', ['created_at'], unique=False,
+                              postgresql_where=sa.text('notify_pending'),
+                              sqlite_where=sa.text('notify_pending'))
+
+
+def downgrade():
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.drop_index('ix_post_notify_pending')
+        batch_op.drop_column('notify_pending')
@@ -0,0 +1,31 @@
+"""Related post related_post_id index
+
+Индекс для related.update_related (DELETE ... WHERE post_id = ? OR
+related_post_id = ?) и каскадного удаления поста; найден `flask indexes check`.
+На PostgreSQL создается CONCURRENTLY вне транзакции.
+
+Revision ID: b7d41e6a2c90
+Revises: 3f8a6d2e9b17
+Create Date: 2026-10-19 20:12:40.118305
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d41e6a2c90'
+down_revision = '3f8a6d2e9b17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.create_index('ix_related_post_related_post_id', 'related_post', ['related_post_id'],
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_related_post_related_post_id', table_name='related_post',
+                      postgresql_concurrently=True, if_exists=True)
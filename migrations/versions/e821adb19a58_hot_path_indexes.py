@@ -0,0 +1,63 @@
+"""Hot path indexes
+
+Индексы для запросов из routes.py. На PostgreSQL индексы создаются
+CONCURRENTLY вне транзакции, чтобы не блокировать запись в таблицы.
+Перед созданием уникальных индексов удаляются дубликаты лайков и подписок.
+
+Revision ID: e821adb19a58
+Revises: a26a9a755748
+Create Date: 2026-10-19 16:03:11.520634
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e821adb19a58'
+down_revision = 'a26a9a755748'
+branch_labels = None
+depends_on = None
+
+
+# (имя, таблица, колонки, уникальный)
+INDEXES = [
+    ('ix_comment_post_id_created_at', 'comment', ['post_id', 'created_at'], False),
+    ('ix_comment_created_at', 'comment', ['created_at'], False),
+    ('uq_like_user_id_post_id', 'like', ['user_id', 'post_id'], True),
+    ('ix_like_post_id', 'like', ['post_id'], False),
+    ('ix_like_created_at', 'like', ['created_at'], False),
+    ('uq_subscription_user_id_blog_id', 'subscription', ['user_id', 'blog_id'], True),
+    ('ix_subscription_blog_id', 'subscription', ['blog_id'], False),
+    ('ix_post_blog_id_created_at', 'post', ['blog_id', 'created_at'], False),
+    ('ix_blog_created_at', 'blog', ['created_at'], False),
+    ('ix_blog_owner_id', 'blog', ['owner_id'], False),
+    ('ix_attachment_filename', 'attachment', ['filename'], False),
+    ('ix_attachment_post_id', 'attachment', ['post_id'], False),
+    ('ix_post_tags_tag_id', 'post_tags', ['tag_id'], False),
+]
+
+
+def _delete_duplicates(table, columns):
+    """Оставляет по одной строке (с минимальным id) на каждую комбинацию columns"""
+    keys = ', '.join(columns)
+    op.execute(sa.text(
+        f'DELETE FROM "{table}" WHERE id NOT IN '
+        f'(SELECT MIN(id) FROM "{table}" GROUP BY {keys})'
+    ))
+
+
+def upgrade():
+    _delete_duplicates('like', ['user_id', 'post_id'])
+    _delete_duplicates('subscription', ['user_id', 'blog_id'])
+
+    with op.get_context().autocommit_block():
+        for name, table, columns, unique in INDEXES:
+            op.create_index(name, table, columns, unique=unique,
+                            postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns, unique in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)